@@ -0,0 +1,211 @@
+# emergent1 LASER MASTER - boru hattı benchmark'ı (ekransız)
+# Sentetik ve fixture resimlerle boyut / DPI / materyal matrisinde her aşamayı ayrı ölçer,
+# tepe belleği raporlar; sonuçları JSON taban dosyasına yazar ya da onunla karşılaştırır.
+#   python bench_pipeline.py -o bench_baseline.json
+#   python bench_pipeline.py --compare bench_baseline.json --threshold 0.15
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from PIL import Image, ImageDraw
+import numpy as np
+
+import laser_engine
+
+
+SIZES_MM = (50, 200, 999)
+DPIS = (150, 300, 999)
+QUICK = {"sizes": (50, 100), "dpis": (150, 300), "presets": ("DEFAULT",)}
+SYNTH_SIZE = (3000, 2000)
+SYNTH_FACES = ((1100, 500, 420, 420), (2050, 650, 300, 300))# "synthetic-faces" için sabit kutular (kaynakta)
+
+
+def synthetic_image(size=SYNTH_SIZE, seed=0):# tekrarlanabilir test resmi: degrade + doku + şekiller + gürültü
+    rs = np.random.RandomState(seed)
+    w, h = size
+    x = np.arange(w, dtype=np.float32)[None, :]; y = np.arange(h, dtype=np.float32)[:, None]
+    base = 128 + 60 * np.sin(x / 37) * np.cos(y / 53) + 100 * (x / w - 0.5)
+    rgb = np.empty((h, w, 3), np.uint8)# kanal kanal: tepe bellek (maxrss) ölçümü şişmesin
+    for c, (gain, off) in enumerate(((1.0, 0), (0.9, 20), (0.8, 30))):
+        rgb[..., c] = np.clip(base * gain + off + rs.randint(-20, 21, (h, w)).astype(np.float32), 0, 255)
+    img = Image.fromarray(rgb)
+    draw = ImageDraw.Draw(img)
+    for _ in range(150):
+        cx, cy, r = rs.randint(0, w), rs.randint(0, h), rs.randint(10, 200)
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), outline=tuple(rs.randint(0, 256, 3).tolist()),
+                     width=int(rs.randint(1, 8)))
+    return img.convert("RGBA")
+
+
+class FixedFaces:# gerçek dedektör çalışır (süresi ölçülür) ama sonuç sabit kutulardır
+    def __init__(self, inner, boxes, src_size):
+        self.inner, self.boxes, self.src_size = inner, boxes, src_size
+
+    def detect(self, rgb):
+        if self.inner: self.inner.detect(rgb)
+        return laser_engine.scale_boxes(self.boxes, self.src_size, (rgb.shape[1], rgb.shape[0]))
+
+
+def load_case_image(spec):# -> resim, yüz dedektörü
+    detector = laser_engine.make_face_detector(spec["detector"])
+    if spec["image"] == "synthetic":
+        return synthetic_image(), detector
+    if spec["image"] == "synthetic-faces":
+        return synthetic_image(seed=1), FixedFaces(detector, SYNTH_FACES, SYNTH_SIZE)
+    return laser_engine.SourceImage(spec["path"]).full(), detector
+
+
+def _render_once(img, params, detector, workers, tiled, tmp):# -> {aşama: sn}
+    if tiled:
+        outputs = {k: os.path.join(tmp, f"{k}.png") for k in laser_engine.MODES}
+        stats = laser_engine.RenderStats("tiled")
+        laser_engine.render_tiled(img, params, outputs, detector, stats=stats)
+        return dict({"tiled." + k: v for k, v in stats.times.items()}, total=stats.total)
+    preview, final = laser_engine.RenderStats("preview"), laser_engine.RenderStats("final")
+    # önizleme (process() yolu) ve final render ayrı, soğuk önbellekle ölçülür
+    laser_engine.Pipeline(detector, workers=workers).render(img, params, fit=laser_engine.PREVIEW_FIT, stats=preview)
+    laser_engine.Pipeline(detector, workers=workers).render(img, params, stats=final)
+    times = dict(final.times, total=final.total)
+    times.update({"preview." + k: v for k, v in preview.times.items()}, **{"preview.total": preview.total})
+    return times
+
+
+def _finalize_once(img):# StudioX_FreeEditor.finalize, Tk penceresi açmadan (editör durumu taklit edilir)
+    from emergent2 import StudioX_FreeEditor
+    proxy = img.copy(); proxy.thumbnail(StudioX_FreeEditor.DISPLAY_SIZE)
+    display = proxy.rotate(7.5, expand=True); display.thumbnail(StudioX_FreeEditor.DISPLAY_SIZE)
+    w, h = display.size
+    var = lambda v: SimpleNamespace(get=lambda: v)
+    editor = SimpleNamespace(source=laser_engine.SourceImage(img), proxy=proxy, target_px=None, bright=var(1.1), contrast=var(1.2), sat=var(0.9),
+                             rotation=var(7.5), display_img=display,
+                             crop_box=(w // 10, h // 10, w * 9 // 10, h * 9 // 10),
+                             callback=lambda result, placement: None, destroy=lambda: None)
+    t0 = time.perf_counter()
+    StudioX_FreeEditor.finalize(editor)
+    return {"finalize": time.perf_counter() - t0, "total": time.perf_counter() - t0}
+
+
+def run_case(spec):# alt süreçte çalışır (her vaka temiz bellekle başlar)
+    img, detector = load_case_image(spec)
+    with tempfile.TemporaryDirectory(prefix="laser_bench_") as tmp:
+        if spec["kind"] == "editor":
+            run = lambda: _finalize_once(img)
+        else:
+            params = laser_engine.preset_params(spec["preset"], w_mm=spec["w_mm"], dpi=spec["dpi"])
+            tiled = laser_engine.use_tiled(img, params)
+            run = lambda: _render_once(img, params, detector, spec["workers"], tiled, tmp)
+        tracemalloc.start()# bellek: ayrı bir ısınma turunda (izleme süreleri bozmasın)
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        best = {}
+        for _ in range(spec["repeat"]):# her aşama için en iyi (en az gürültülü) süre
+            for k, v in run().items():
+                best[k] = min(v, best.get(k, v))
+    return {"stages": {k: round(v, 5) for k, v in sorted(best.items())},
+            "peak_mb": round(peak / 2**20, 1), "maxrss_mb": laser_engine.peak_rss_mb()}
+
+
+def build_cases(args):# (vaka adı, spec) listesi; --max-mp üstü çıktılar atlanır
+    images = [("synthetic", None, SYNTH_SIZE), ("synthetic-faces", None, SYNTH_SIZE)]
+    for path in laser_engine.collect_inputs(args.images or []):
+        images.append((os.path.splitext(os.path.basename(path))[0], path, laser_engine.SourceImage(path).size))
+    common = {"detector": args.face_detector, "repeat": args.repeat, "workers": args.workers}
+    cases, skipped = [], []
+    for name, path, size in images:
+        if not args.no_editor:
+            cases.append((f"{name}/editor-finalize", dict(common, kind="editor", image=name, path=path)))
+        for mat in args.presets:
+            for w_mm in args.sizes:
+                for dpi in args.dpis:
+                    case = f"{name}/{mat}/{w_mm:g}mm@{dpi:g}"
+                    w, h = laser_engine.output_size(SimpleNamespace(width=size[0], height=size[1]), w_mm, dpi)
+                    if w * h > args.max_mp * 1e6:
+                        skipped.append(case); continue
+                    cases.append((case, dict(common, kind="render", image=name, path=path, preset=mat,
+                                             w_mm=w_mm, dpi=dpi)))
+    return cases, skipped
+
+
+def compare(base, cur, threshold, min_ms):# -> gerileme satırları (sadece iki tarafta da olan aşamalar)
+    regressions = []
+    for case, new in cur.get("cases", {}).items():
+        old = base.get("cases", {}).get(case)
+        if old is None: continue
+        for stage, t in new.get("stages", {}).items():
+            t_old = old.get("stages", {}).get(stage)
+            if not t_old: continue
+            if t > t_old * (1 + threshold) and (t - t_old) * 1000 >= min_ms:
+                regressions.append(f"{case} {stage}: {t_old * 1000:.1f} -> {t * 1000:.1f} ms (+{100 * (t / t_old - 1):.0f}%)")
+        for key in ("peak_mb", "maxrss_mb"):
+            m, m_old = new.get(key), old.get(key)
+            if m and m_old and m > m_old * (1 + threshold):
+                regressions.append(f"{case} {key}: {m_old} -> {m} MB (+{100 * (m / m_old - 1):.0f}%)")
+    return regressions
+
+
+def _csv(cast):
+    return lambda s: tuple(cast(v) for v in s.split(",") if v)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="emergent1 LASER MASTER - aşama bazlı benchmark")
+    ap.add_argument("-o", "--out", default=None, help="sonuçların yazılacağı JSON (varsayılan: bench_baseline.json)")
+    ap.add_argument("--compare", default=None, help="taban JSON: eşik üstü yavaşlama/bellek artışı raporlanır")
+    ap.add_argument("--threshold", type=float, default=0.15, help="gerileme eşiği (oran, varsayılan 0.15 = %%15)")
+    ap.add_argument("--min-ms", type=float, default=5.0, help="bundan küçük süre farkları gürültü sayılır")
+    ap.add_argument("--images", nargs="*", help="fixture resimleri (klasör/glob; yüzlü portreler önerilir)")
+    ap.add_argument("--sizes", type=_csv(float), default=None, help="mm genişlikler, virgülle")
+    ap.add_argument("--dpis", type=_csv(float), default=None, help="DPI değerleri, virgülle")
+    ap.add_argument("--presets", type=_csv(str), default=None)
+    ap.add_argument("--max-mp", type=float, default=40.0, help="bundan büyük çıktılar atlanır (megapiksel)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=1, help="Pipeline dal thread sayısı (1: kararlı aşama süreleri)")
+    ap.add_argument("--face-detector", default=None)
+    ap.add_argument("--no-editor", action="store_true", help="editör finalize ölçümünü atla")
+    ap.add_argument("--quick", action="store_true", help="küçük matris (hızlı duman testi; açıkça verilen seçenekler korunur)")
+    args = ap.parse_args(argv)
+    defaults = {"sizes": SIZES_MM, "dpis": DPIS, "presets": tuple(sorted(laser_engine.PRESETS))}
+    if args.quick: defaults.update(QUICK)
+    for k, v in defaults.items():
+        if getattr(args, k) is None: setattr(args, k, v)
+
+    cases, skipped = build_cases(args)
+    results = {"meta": {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                        "platform": platform.platform(), "cpus": os.cpu_count(), "numpy": np.__version__,
+                        "pillow": Image.__version__, "opencv": laser_engine.cv2.__version__,
+                        "repeat": args.repeat, "workers": args.workers},
+               "cases": {}, "skipped": skipped}
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for (case, _), res in zip(cases, pool.imap(run_case, [spec for _, spec in cases])):
+            results["cases"][case] = res
+            st = res["stages"]
+            slow = max((k for k in st if not k.endswith("total")), key=st.get, default="-")
+            print(f"{case:42s} {st.get('total', 0) * 1000:9.1f} ms  en yavaş: {slow} {st.get(slow, 0) * 1000:.1f} ms  "
+                  f"tepe {res['peak_mb']} MB  rss {res['maxrss_mb']} MB", flush=True)
+    if skipped: print(f"{len(skipped)} vaka --max-mp {args.max_mp:g} üstünde, atlandı")
+
+    out = args.out or (None if args.compare else "bench_baseline.json")
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, ensure_ascii=False)
+        print("yazıldı:", out)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold, args.min_ms)
+        for line in regressions: print("GERİLEME", line)
+        print(f"{len(regressions)} gerileme (eşik %{100 * args.threshold:.0f})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
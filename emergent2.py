@@ -1,24 +1,48 @@
+import time
+_T0 = time.perf_counter()# açılış süresi ölçümü (bkz. report_startup)
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk, ImageEnhance, ImageOps, ImageFilter, ImageDraw,ImageFont,ImagePalette,ImageMath
+from PIL import Image, ImageTk
 import numpy as np
-import cv2
 import os
+import sys
+import tempfile
+import threading
+import traceback
+from collections import OrderedDict
+
+import laser_cache
+import laser_engine
 
 
 class StudioX_FreeEditor(tk.Toplevel):
-    def __init__(self, parent, pil_image, callback):
+    DISPLAY_SIZE = (900, 650)
+
+    def __init__(self, parent, source, callback, target_px=None):
+        # source: laser_engine.SourceImage (ya da PIL Image); target_px: çıktının piksel genişliği
+        # (kırpma kaynağın bu kadarını kaplayan en küçük ölçeğinden alınır)
         super().__init__(parent)
         self.title("STUDIO X – Free Crop Editor")
         self.geometry("1200x750")
         self.configure(bg="#000000")
 
         self.callback = callback
+        self.target_px = target_px
 
         # -------- IMAGE STATE (EDITÖRE ÖZEL) --------
-        self.original = pil_image.convert("RGBA")
-        self.preview = self.original.copy()
+        self.source = source if isinstance(source, laser_engine.SourceImage) else laser_engine.SourceImage(source)
+        # Canlı önizleme ekran boyutundaki bir kopya (proxy) üzerinde çalışır; kaynak bu boyutu
+        # kaplayan en küçük ölçekte çözülür. Ayarlar kırpılan bölgeye sadece finalize() içinde uygulanır.
+        # decode() önbellekteki tam çözünürlüğü döndürebilir: thumbnail() gibi yerinde küçültülmez
+        # (crop_source / ensure_resolution sonra kaynaktan kırpar)
+        proxy = self.source.decode(laser_engine.fit_size(self.source.size, self.DISPLAY_SIZE)[0])
+        if proxy.width > self.DISPLAY_SIZE[0] or proxy.height > self.DISPLAY_SIZE[1]:
+            proxy = proxy.resize(laser_engine.fit_size(proxy.size, self.DISPLAY_SIZE)[0], Image.Resampling.BICUBIC,
+                                 reducing_gap=2.0)
+        self.proxy = proxy
+        self.adjusted = None      # (ayarlar, renk ayarlı proxy) - döndürürken yeniden kullanılır
+        self.preview = self.proxy
         self.display_img = None
 
         # -------- ADJUSTMENTS --------
@@ -78,18 +102,17 @@ class StudioX_FreeEditor(tk.Toplevel):
 
     # -------------------------------------------------
     def update_preview(self):
-        img = self.original.copy()
-        img = ImageEnhance.Brightness(img).enhance(self.bright.get())
-        img = ImageEnhance.Contrast(img).enhance(self.contrast.get())
-        img = ImageEnhance.Color(img).enhance(self.sat.get())
-        img = img.rotate(self.rotation.get(), expand=True)
+        adj = (self.bright.get(), self.contrast.get(), self.sat.get())
+        if self.adjusted is None or self.adjusted[0] != adj:# sadece döndürme değiştiyse renk işi tekrarlanmaz
+            self.adjusted = (adj, laser_engine.adjust_colors(self.proxy, *adj))
+        img = self.adjusted[1].rotate(self.rotation.get(), expand=True)
 
         self.preview = img
         self.show_image()
 
     def show_image(self):
-        img = self.preview.copy()
-        img.thumbnail((900, 650))
+        img = self.preview
+        img.thumbnail(self.DISPLAY_SIZE)
         self.display_img = img
 
         self.tk_img = ImageTk.PhotoImage(img)
@@ -119,42 +142,221 @@ class StudioX_FreeEditor(tk.Toplevel):
         if not self.crop_box:
             return
 
-        # 1️⃣ AYARLARI KALICI UYGULA
-        base = self.original.copy()
-        base = ImageEnhance.Brightness(base).enhance(self.bright.get())
-        base = ImageEnhance.Contrast(base).enhance(self.contrast.get())
-        base = ImageEnhance.Color(base).enhance(self.sat.get())
-        base = base.rotate(self.rotation.get(), expand=True)
-
-        # 2️⃣ SCALE (label → gerçek resim)
-        sx = base.width / self.display_img.width
-        sy = base.height / self.display_img.height
+        # 1️⃣ SCALE (label → döndürülmüş tam boy tuval; tuvalin kendisi üretilmez)
+        angle = self.rotation.get()
+        canvas = laser_engine.rotated_size(self.source.size, angle)
+        sx = canvas[0] / self.display_img.width
+        sy = canvas[1] / self.display_img.height
 
         x1, y1, x2, y2 = self.crop_box
-        x1, x2 = sorted([int(x1 * sx), int(x2 * sx)])
-        y1, y2 = sorted([int(y1 * sy), int(y2 * sy)])
+        x1, x2 = sorted([min(max(int(x1 * sx), 0), canvas[0]), min(max(int(x2 * sx), 0), canvas[0])])
+        y1, y2 = sorted([min(max(int(y1 * sy), 0), canvas[1]), min(max(int(y2 * sy), 0), canvas[1])])
+        if x2 <= x1 or y2 <= y1:
+            return
 
-        # 3️⃣ SAYDAM ALPHA MASKE
-        cv_img = cv2.cvtColor(np.array(base), cv2.COLOR_RGBA2BGRA)
-        alpha = np.zeros((base.height, base.width), dtype=np.uint8)
-        alpha[y1:y2, x1:x2] = 255
-        cv_img[:, :, 3] = alpha
+        # 2️⃣ SADECE KIRPILAN BÖLGE: renk ayarı + döndürme kaynaktaki karşılığında yapılır
+        adj = (self.bright.get(), self.contrast.get(), self.sat.get())
+        mean = laser_engine.adjust_mean(np.asarray(self.proxy), adj[0])# kontrast ortalaması tüm resimden (önizlemeyle aynı)
+        placement = {"box": (x1, y1, x2, y2), "canvas": canvas, "rotation": angle,
+                     "source_size": self.source.size, "adjust": adj + (mean,)}
+        target = self.target_px() if self.target_px else None
+        result, placement["scale"] = laser_engine.crop_source(self.source, placement, target)
 
-        result = Image.fromarray(
-            cv2.cvtColor(cv_img, cv2.COLOR_BGRA2RGBA)
-        )
-
-        # 4️⃣ ANA PANELE GÖNDER
-        self.callback(result)
+        # 3️⃣ ANA PANELE GÖNDER: kırpılmış resim + yerleşim bilgisi
+        self.callback(result, placement)
         self.destroy()
 
 
-class LazerMasterCyber:
+class RenderScheduler:
+    # Sürgü sürüklemelerinde gelen art arda istekleri birleştirir (debounce) ve
+    # işlemeyi arka plan thread'inde yapar. Sadece en yeni sonuç panellere gider;
+    # eskiyen render'lar motorun aşama aralarında iptal edilir.
+    def __init__(self, root, snapshot, work, deliver, delay_ms=80, poll_ms=30):
+        self.root = root
+        self.snapshot = snapshot  # ana thread: Tk değişkenlerinden parametreleri okur
+        self.work = work          # işçi thread: work(params, cancel) -> sonuç
+        self.deliver = deliver    # ana thread: deliver(sonuç) ya da deliver(None, hata)
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        self._after_id = None
+        self._polling = False
+        self._gen = 0             # her yeni istekte artar; eski nesiller geçersizdir
+        self._pending = None      # (gen, params) - sadece en yenisi tutulur
+        self._done = None         # (gen, sonuç, hata)
+        self._running = False
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def request(self, delay_ms=None):# ana thread: yeni render iste (ardışık çağrılar birleşir)
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(self.delay_ms if delay_ms is None else delay_ms, self._kick)
+
+    def busy(self):# ön planda bekleyen/çalışan render var mı (arka plan işleri yol verir)
+        with self._cond:
+            return self._after_id is not None or self._pending is not None or self._running
+
+    def _kick(self):
+        self._after_id = None
+        params = self.snapshot()
+        if params is None: return
+        with self._cond:
+            self._gen += 1
+            self._pending = (self._gen, params)
+            self._cond.notify()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _is_stale(self, gen):
+        return gen != self._gen
+
+    def _loop(self):# işçi thread
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                gen, params = self._pending
+                self._pending = None
+                self._running = True
+            result, err = None, None
+            try:
+                result = self.work(params, lambda: self._is_stale(gen))
+            except laser_engine.RenderCancelled:
+                gen = None
+            except Exception as e:
+                err = e
+            with self._cond:
+                self._running = False
+                if gen is not None and not self._is_stale(gen):
+                    self._done = (gen, result, err)
+
+    def _poll(self):# ana thread: biten sonucu panellere aktarır
+        with self._cond:
+            done, self._done = self._done, None
+            idle = self._pending is None and not self._running
+        if done is not None and not self._is_stale(done[0]):
+            self.deliver(done[1], done[2])
+        if idle and self._after_id is None:
+            self._polling = False
+        else:
+            self.root.after(self.poll_ms, self._poll)
+
+
+class PresetPrefetcher:
+    # Resim yüklendikten sonra dört materyal presetinin önizlemesini arka planda hazırlar;
+    # preset butonu hazır sonucu render'sız gösterir. Sonuçlar (resim, parametreler) anahtarlı,
+    # sınırlı bir LRU'da tutulur. Ön planda render varken hazırlık bekler, sürmekte olan
+    # iş aşama arasında kesilir ve sonra yeniden denenir.
+    def __init__(self, work, busy, max_items=8, on_error=None):
+        self.work = work          # işçi thread: work(job, cancel) -> sonuç
+        self.busy = busy          # True iken ön plan render'ı var
+        self.on_error = on_error  # işçi thread: on_error(hata) - iş sıradan düşer
+        self.max_items = max_items
+        self._items = OrderedDict()  # anahtar -> (resim, sonuç)
+        self._jobs = []
+        self._gen = 0
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    @staticmethod
+    def key(job):# sürgü değerleri çözünürlüğe yuvarlanırken oluşan kayan nokta artıkları yok sayılır
+        img, params = job
+        return id(img), tuple((k, round(v, 6) if isinstance(v, float) else v) for k, v in sorted(params.items()))
+
+    def get(self, job):
+        with self._cond:
+            hit = self._items.get(self.key(job))
+            if hit is None or hit[0] is not job[0]: return None
+            self._items.move_to_end(self.key(job))
+            return hit[1]
+
+    def schedule(self, jobs):# ana thread: eski sıra iptal, önbellekte olmayanlar sıraya
+        with self._cond:
+            self._gen += 1
+            self._jobs = [j for j in jobs if self._items.get(self.key(j), (None,))[0] is not j[0]]
+            self._cond.notify()
+
+    def _loop(self):# işçi thread
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                gen, job = self._gen, self._jobs[0]
+            if self.busy():
+                time.sleep(0.05); continue
+            try:
+                result = self.work(job, lambda: gen != self._gen or self.busy())
+            except laser_engine.RenderCancelled:
+                continue# sırada kalır; boşta yeniden denenir
+            except Exception as e:
+                if self.on_error: self.on_error(e)
+                result = None
+            with self._cond:
+                if self._jobs and self._jobs[0] is job: self._jobs.pop(0)
+                if result is not None:
+                    self._items[self.key(job)] = (job[0], result)
+                    while len(self._items) > self.max_items: self._items.popitem(last=False)
+
+
+class BulkExporter:
+    # "EXPORT ALL": seçili çıktıları arka plan thread'inde diske yazar, arayüz donmaz.
+    # İşçi ilerlemeyi step() ile bildirir; ana thread root.after ile okuyup çubuğu günceller.
+    # Aynı anda tek dışa aktarma çalışır.
+    def __init__(self, root, work, progress, deliver, poll_ms=100):
+        self.root = root
+        self.work = work          # işçi thread: work(step, *args) -> sonuç
+        self.progress = progress  # ana thread: progress(0..1)
+        self.deliver = deliver    # ana thread: deliver(sonuç) ya da deliver(None, hata)
+        self.poll_ms = poll_ms
+        self.running = False
+        self._done, self._total, self._result = 0, 1, None
+        self._lock = threading.Lock()
+
+    def start(self, *args):# ana thread; çalışan iş varsa False
+        if self.running: return False
+        self.running = True
+        self._done, self._total, self._result = 0, 1, None
+        threading.Thread(target=self._run, args=args, daemon=True).start()
+        self.root.after(self.poll_ms, self._poll)
+        return True
+
+    def step(self, n=1, total=None):# işçi thread: n adım bitti (total: toplam adım sayısı)
+        with self._lock:
+            if total is not None: self._total = max(total, 1)
+            self._done += n
+
+    def _run(self, *args):# işçi thread
+        result, err = None, None
+        try:
+            result = self.work(self.step, *args)
+        except Exception as e:
+            err = e
+        with self._lock:
+            self._result = (result, err)
+
+    def _poll(self):# ana thread
+        with self._lock:
+            frac, finished = min(self._done / self._total, 1.0), self._result
+        self.progress(frac)
+        if finished is None:
+            self.root.after(self.poll_ms, self._poll); return
+        self.running = False
+        self.deliver(*finished)
+
 
-    def receive_from_editor(self, cv_img):
-        self.orig_img = cv_img  # RGBA, kırpılmış, saydam
-        self.orig_img = Image.open(path).convert("RGBA")
-        self.process_image()
+class RowCounter:# render_tiled yazıcısı: yazılan satırları ilerleme adımı olarak bildirir
+    def __init__(self, step):
+        self.step = step
+
+    def write(self, rows):
+        self.step(len(rows))
+
+    def close(self):
+        pass
+
+
+class LazerMasterCyber:
 
     def __init__(self, root):
         self.orig_img = None
@@ -165,13 +367,36 @@ class LazerMasterCyber:
         self.root.geometry("1600x950")
         self.root.configure(bg="#000000")
         self.orig_img = None
+        self.placement = None  # editörden gelen kırpmanın yerleşimi
+        self.source = None     # kırpmanın kaynağı (laser_engine.SourceImage)
         self.ratio = 1.0
-        self.res = {}
+        self.res = {}          # tam çözünürlük çıktılar (render_final)
+        self.final_params = None
+        self.preview_res = {}  # panel boyutunda önizleme çıktıları
+        # Sürgü/alan değişiklikleri birleştirilip arka planda işlenir (bkz. process)
+        self.scheduler = RenderScheduler(root, self.render_params, self.render_job, self.show_result)
+        # Materyal presetleri boşta önceden hesaplanır; preset değişimi tek (çoğu zaman hazır) render'dır
+        self.prefetch = PresetPrefetcher(lambda job, cancel: self.render_job(job, cancel, "prefetch"),
+                                         self.scheduler.busy, on_error=lambda e: self.log_error("prefetch", e))
+        self.suspend_render = False# apply_preset sürgüleri ayarlarken process() yok sayılır
+        self.exporter = BulkExporter(root, self.export_job, self.show_export_progress, self.export_done)
        
-        # Cascade Dosyası Kontrolü
-        cv_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        local_path = "haarcascade_frontalface_default.xml"
-        self.face_cascade = cv2.CascadeClassifier(local_path if os.path.exists(local_path) else cv_path)
+        # Aşama önbellekli boru hattı: sadece değişen sürgünün etkilediği aşamalar yeniden hesaplanır.
+        # Yüz dedektörü (OpenCV + cascade) açılışı yavaşlatmasın diye ilk resimde yüklenir.
+        # Yüz kutuları ve final çıktılar oturumlar arası diskte de tutulur (LASER_CACHE="" kapatır).
+        cache_dir = laser_cache.default_dir()
+        disk = laser_cache.DiskCache(cache_dir, on_error=lambda e: self.log_error("cache", e)) if cache_dir else None
+        self.pipeline = laser_engine.Pipeline(disk=disk)
+        self.detector_loaded = False
+        # Ölçümler: her render'ın aşama dökümü ANALYSIS paneline ve JSON satırlı günlüğe (bkz. render_log).
+        # LASER_PROFILE=dosya.prof verilirse oturumun en yavaş render'ının cProfile çıktısı yazılır.
+        self.log = laser_engine.render_log()
+        self.final_stats = None
+        self.profiler = None
+        if os.environ.get("LASER_PROFILE"):
+            prof = os.environ["LASER_PROFILE"]
+            self.profiler = laser_engine.SlowestProfiler(prof if prof.endswith(".prof") else "slowest_render.prof")
+            self.pipeline.workers = 1# cProfile sadece çağıran thread'i görür
 
         # ================= TOP PANEL (HEADER) =================
         header_f = tk.Frame(root, bg="#1a1a1a", height=70, highlightthickness=1, highlightbackground="#39ff14")
@@ -298,10 +523,45 @@ class LazerMasterCyber:
 
         tk.Label(export_f, text="EXPORT PANEL", bg="#050505", fg="#39ff14", font=('Courier New', 13, 'bold')).pack(pady=(0, 10))
         # export_f içine butonlu çerçeveleri ekliyoruz
+        self.neon_frame(export_f, "⚙ RENDER FINAL", self.render_final, "#ff0055", "#1a1a1a").pack(fill="x", pady=5)
         self.neon_frame(export_f, "💾 SAVE GRAY", lambda: self.save("gray"), "#00f2ff", "#1a1a1a").pack(fill="x", pady=5)
         self.neon_frame(export_f, "💾 SAVE DITHER", lambda: self.save("gray_d"), "#00f2ff", "#1a1a1a").pack(fill="x", pady=5)
+        # dither algoritması: materyal presetiyle gelir, buradan değiştirilebilir (önizleme yenilenir)
+        self.dither_var = tk.StringVar(value=laser_engine.DEFAULT_PARAMS["dither"])
+        dither_m = tk.OptionMenu(export_f, self.dither_var, *laser_engine.DITHER_METHODS, command=lambda _: self.process())
+        dither_m.config(bg="#1a1a1a", fg="#00f2ff", activebackground="#00f2ff", activeforeground="#000000",
+                        font=('Courier New', 9, 'bold'), relief="flat", highlightthickness=1, highlightbackground="#00f2ff")
+        dither_m["menu"].config(bg="#1a1a1a", fg="#00f2ff", font=('Courier New', 9))
+        dither_m.pack(fill="x", pady=(0, 5))
         self.neon_frame(export_f, "💾 SAVE SKETCH", lambda: self.save("sketch"), "#39ff14", "#1a1a1a").pack(fill="x", pady=5)
         self.neon_frame(export_f, "💾 SAVE LINE ART", lambda: self.save("line_art"), "#39ff14", "#1a1a1a").pack(fill="x", pady=5)
+        # doğrudan lazere: seçili çıktı raster G-code olarak yazılır (güç aralığı materyal presetinden)
+        self.neon_frame(export_f, "⚡ EXPORT G-CODE", self.save_gcode, "#ff0055", "#1a1a1a").pack(fill="x", pady=(5, 0))
+        self.gcode_var = tk.StringVar(value="line_art")
+        gcode_m = tk.OptionMenu(export_f, self.gcode_var, *laser_engine.GCODE_MODES)
+        gcode_m.config(bg="#1a1a1a", fg="#ff0055", activebackground="#ff0055", activeforeground="#000000",
+                       font=('Courier New', 9, 'bold'), relief="flat", highlightthickness=1, highlightbackground="#ff0055")
+        gcode_m["menu"].config(bg="#1a1a1a", fg="#ff0055", font=('Courier New', 9))
+        gcode_m.pack(fill="x", pady=(0, 5))
+        self.neon_frame(export_f, "✎ EXPORT SVG/DXF", self.save_vector, "#39ff14", "#1a1a1a").pack(fill="x", pady=5)
+        # seçili çıktıların hepsi tek klasöre, arka planda (line_art / dither paketli 1 bit)
+        self.neon_frame(export_f, "⇪ EXPORT ALL", self.export_all, "#ff0055", "#1a1a1a").pack(fill="x", pady=(5, 0))
+        all_f = tk.Frame(export_f, bg="#050505")
+        all_f.pack(fill="x")
+        self.export_vars = {}
+        for i, (k, t) in enumerate([("gray", "GRAY"), ("gray_d", "DITHER"), ("sketch", "SKETCH"), ("line_art", "LINE ART")]):
+            self.export_vars[k] = tk.BooleanVar(value=True)
+            tk.Checkbutton(all_f, text=t, variable=self.export_vars[k], bg="#050505", fg="#ff0055",
+                           selectcolor="#000000", activebackground="#050505",
+                           font=('Arial', 8, 'bold')).grid(row=i//2, column=i%2, sticky="w")
+        self.export_fmt = tk.StringVar(value="png")
+        fmt_m = tk.OptionMenu(export_f, self.export_fmt, *laser_engine.EXPORT_FORMATS)
+        fmt_m.config(bg="#1a1a1a", fg="#ff0055", activebackground="#ff0055", activeforeground="#000000",
+                     font=('Courier New', 9, 'bold'), relief="flat", highlightthickness=1, highlightbackground="#ff0055")
+        fmt_m["menu"].config(bg="#1a1a1a", fg="#ff0055", font=('Courier New', 9))
+        fmt_m.pack(fill="x")
+        self.export_bar = ttk.Progressbar(export_f, maximum=1.0, mode="determinate")
+        self.export_bar.pack(fill="x", pady=(2, 5))
 
         tk.Label(export_f, text="[ ANALYSIS ]", bg="#050505", fg="#00f2ff", font=('Courier New', 12, 'bold')).pack(anchor="w", pady=(15, 2))
         self.info = tk.Label(export_f, bg="#000000", fg="#00f2ff", font=('Consolas', 11),
@@ -329,6 +589,13 @@ class LazerMasterCyber:
             lbl.bind("<Enter>", lambda e, key=k: self.set_active_panel(key))
             lbl.bind("<Leave>", lambda e: self.set_active_panel(None))
         self.view.grid_columnconfigure((0,1), weight=1); self.view.grid_rowconfigure((0,1), weight=1)
+        self.root.after_idle(self.report_startup)
+
+    def report_startup(self):# pencere ekrana geldiğinde açılış süresini raporlar
+        self.startup_ms = (time.perf_counter() - _T0) * 1000
+        print(f"STARTUP: {self.startup_ms:.0f} ms")
+        self.info.config(text=f"> STATUS: WAITING IMAGE\n> STARTUP: {self.startup_ms:.0f} ms\n> ENGINE: V3.7_LINE_ART")
+        if "--startup-time" in sys.argv: self.root.destroy()# ölçüm modu: sürümler arası takip için
 
     def validate_numeric(self, P):
             # P, kutunun o anki halidir
@@ -338,19 +605,17 @@ class LazerMasterCyber:
             return True
         return False
 
-    def create_texture_image(self, name, c1, c2):#materyal butonları için degrade doku oluşturur.
-        img = Image.new("RGB", (115, 35), c1); 
-        draw = ImageDraw.Draw(img)
-        r1, g1, b1 = self.hex_to_rgb(c1); r2, g2, b2 = self.hex_to_rgb(c2)
-        for y in range(35):
-            r, g, b = int(r1+(r2-r1)*(y/35)), int(g1+(g2-g1)*(y/35)), int(b1+(b2-b1)*(y/35))
-            for x in range(115):
-                noise = np.random.randint(-15, 15)
-                if name == "WOOD" and (x+y*2)%25 < 2: noise = -35
-                elif name == "METAL" and y%2 == 0: noise = 8
-                elif name == "STONE" and np.random.rand() > 0.92: noise = 40
-                draw.point((x,y), fill=(max(0,min(255,r+noise)), max(0,min(255,g+noise)), max(0,min(255,b+noise))))
-        return ImageTk.PhotoImage(img)
+    def create_texture_image(self, name, c1, c2):#materyal butonları için degrade doku oluşturur (tek numpy geçişi).
+        h, w = 35, 115
+        c1 = np.array(self.hex_to_rgb(c1)); c2 = np.array(self.hex_to_rgb(c2))
+        grad = (c1 + (c2 - c1) * (np.arange(h) / h)[:, None]).astype(int)# satır başına renk (dikey degrade)
+        y, x = np.mgrid[0:h, 0:w]
+        noise = np.random.randint(-15, 15, (h, w))
+        if name == "WOOD": noise[(x + y*2) % 25 < 2] = -35
+        elif name == "METAL": noise[y % 2 == 0] = 8
+        elif name == "STONE": noise[np.random.rand(h, w) > 0.92] = 40
+        rgb = np.clip(grad[:, None, :] + noise[..., None], 0, 255).astype(np.uint8)
+        return ImageTk.PhotoImage(Image.fromarray(rgb))
 
     def hex_to_rgb(self, hex_color):#hex renk kodunu RGB tuple'a çevirir.
         hex_color = hex_color.lstrip('#')
@@ -400,17 +665,28 @@ class LazerMasterCyber:
         return s
 
     def apply_preset(self, mat):#materyal butonlara default ayarları uygulanır.
-        self.material_var.set(mat); ps = {"WOOD":(0.9,1.15,35,11,5), 
-         "DEFAULT":(1.0,1.0,25,45,5), 
-         "METAL":(0.9,1.0,35,76,5), 
-         "STONE":(1.3,0.75,35,100,5)}
-        b,c,s,bg,d = ps[mat]; 
+        # Her Scale.set komutu (boşta) process() tetikler; hepsi yok sayılır, sonda tek render istenir
+        self.suspend_render = True
+        self.material_var.set(mat)
+        b,c,s,bg,d = laser_engine.PRESETS[mat]; 
         self.bright_s.set(b); 
         self.contrast_s.set(c); 
         self.sketch_s.set(s); 
         self.bg_strength.set(bg);
         self.face_blur_s.set(d); 
-        self.process()
+        self.dither_var.set(laser_engine.PRESET_DITHER[mat])
+        self.root.after_idle(self.resume_render)# sürgü komutlarından sonra çalışır
+
+    def resume_render(self):
+        self.suspend_render = False
+        self.scheduler.request(0)# preset önceden hazırlandıysa beklemeden gösterilir
+
+    def preset_jobs(self, params):# o anki resim + parametrelerle dört preset önizlemesi
+        jobs = []
+        for mat, (b, c, s, bg, d) in laser_engine.PRESETS.items():
+            jobs.append((self.orig_img, dict(params, bright=b, contrast=c, sketch=s, bg=bg, face_blur=d,
+                                             dither=laser_engine.PRESET_DITHER[mat])))
+        return jobs
 
     def sync_h(self, *_):# w değiştiğinde h yi günceller
         try:
@@ -438,103 +714,253 @@ class LazerMasterCyber:
         if not path:
             return
 
-        img = Image.open(path)
+        src = laser_engine.SourceImage(path)# sadece başlık; pikseller ihtiyaç kadar çözülür
 
         StudioX_FreeEditor(
             self.root,
-            img,
-            self.receive_from_editor
+            src,
+            lambda img, placement: self.receive_from_editor(img, placement, src),
+            self.target_px
         )
-    def receive_from_editor(self, img):
+
+    def target_px(self):# seçili mm/DPI'da çıktının piksel genişliği
+        try:
+            return float(self.w_mm.get() or 100) / 25.4 * float(self.dpi_var.get() or 250)
+        except (ValueError, tk.TclError):
+            return None
+    def load_face_detector(self):# ilk resim geldiğinde bir kez (LASER_FACE_DETECTOR ile DNN seçilebilir)
+        if not self.detector_loaded:
+            self.detector_loaded = True
+            self.pipeline.face_detector = laser_engine.make_face_detector(os.environ.get("LASER_FACE_DETECTOR"))
+
+    def receive_from_editor(self, img, placement=None, source=None):# img: editörde kırpılan bölge; mm boyutu buna göre
+        self.load_face_detector()
         self.orig_img = img.convert("RGBA")
-        self.process_image()
-
-    def detect_and_clean_faces(self, pil_img):#yüz algılama ve blurlaştırma fonksiyonu
-        if not self.face_cascade: return pil_img
-        cv_img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR); gray_cv = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray_cv, 1.1, 5, minSize=(30, 30))
-        b_val = int(self.face_blur_s.get()); b_val = b_val if b_val % 2 != 0 else b_val + 1
-        for (x, y, w, h) in faces:
-            roi = cv_img[y:y+h, x:x+w]; roi = cv2.GaussianBlur(roi, (b_val, b_val), 0); cv_img[y:y+h, x:x+w] = roi
-        return Image.fromarray(cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB))
-
-    def process(self):# resim işleme fonksiyonu.
-        if not isinstance(self.orig_img, Image.Image):
-                print("HATA: orig_img PIL Image değil!", type(self.orig_img))
-                return   
-        cv_img = cv2.cvtColor(
-            np.array(self.orig_img),
-            cv2.COLOR_RGBA2BGRA
-        )
-        if not self.orig_img: return
+        self.placement = placement# kırpmanın döndürülmüş tuvaldeki yeri (box, canvas, rotation, scale)
+        self.source = source
+        self.ratio = self.orig_img.width / self.orig_img.height
+        self.final_params = None# yeni resim: eski final render geçersiz
+        self.sync_h()# h alanını yeni orana göre günceller ve process() çağırır
+
+    def current_params(self):# sürgü/alan değerleri -> motor parametreleri
+        return {"bright": self.bright_s.get(), "contrast": self.contrast_s.get(),
+                "sketch": self.sketch_s.get(), "bg": self.bg_strength.get(),
+                "face_blur": self.face_blur_s.get(), "invert": self.neg_var.get(),
+                "dither": self.dither_var.get(),
+                "w_mm": float(self.w_mm.get() or 100), "dpi": float(self.dpi_var.get() or 250)}
+
+    def process(self):# resim işleme isteği; iş RenderScheduler ile arka planda yapılır.
+        if self.suspend_render: return
+        self.scheduler.request()
+
+    def render_params(self, final=False):# ana thread: o anki resim + parametrelerin anlık görüntüsü
+        if not isinstance(self.orig_img, Image.Image): return None
         try:
-            dpi = float(self.dpi_var.get() or 250); px_w = int((float(self.w_mm.get() or 100)/25.4)*dpi); px_h = int(px_w/self.ratio)
-            work = self.orig_img.resize((px_w, px_h), Image.Resampling.LANCZOS); 
-            work = self.detect_and_clean_faces(work)
-            base = work.convert("L"); 
-            base = ImageEnhance.Brightness(base).enhance(self.bright_s.get()); 
-            base = ImageEnhance.Contrast(base).enhance(self.contrast_s.get())
-            if self.neg_var.get(): base = ImageOps.invert(base)
-
-            # ... (resizing ve face_blur işlemleri bittikten sonra) ...
-
-            #work = self.detect_and_clean_faces(work)
-            bas = work.convert("L") # Siyah-beyaza çevir
-
-            # 1. Önce Resme Varsayılan (Default) Bir Artış Uygula
-            # Örneğin: Parlaklığı %20, Kontrastı %30 sabit artırıyoruz.
-            default_bright = 1.0 
-            default_contrast = 1.5
-            # 2. Sürgü Değerleriyle Birleştirerek Uygula
-            # Sürgü 1.0 (orta) konumundayken resim senin verdiğin default değerde görünür.
-            bas = ImageEnhance.Brightness(bas).enhance(default_bright * self.bright_s.get())
-            bas = ImageEnhance.Contrast(bas).enhance(default_contrast * self.contrast_s.get())
-
-            # Invert kontrolü
-            if self.neg_var.get():
-                bas = ImageOps.invert(bas)
-
-            gri = bas  # Senin istediğin 'gri' artık saf siyah-beyaz ve slider etkisinde olan resim
-            #=========================
-            #Gri tonlamadan dithere dönüştürme
-            dither = gri.convert("1")# pillowun dithering fonksiyonu.
-            #=========================
-
-            # Sketch Moda geçiş: gray scale with bg cleaner skech oluşturmak için orijinal resmi yeniden işliyoruz. 
-            np_img = np.array(base); strg = self.bg_strength.get(); block = int(11 + strg//5*2)
-            th = cv2.adaptiveThreshold(np_img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block|1, 5)
-            gray = Image.fromarray((np_img*(1-strg/100) + th*(strg/100)).astype(np.uint8))
-            
-            # Sketch Mode
-            inv = ImageOps.invert(gray)
-            sketch = Image.blend(gray, inv.filter(ImageFilter.GaussianBlur(self.sketch_s.get())), 0.3)
-            sketch = ImageEnhance.Contrast(sketch).enhance(3.0)
-            #=========================
-            # --- YENİ: LINE ART ENGINE (Sketch üzerinden türetilir) ---
-            # Sketch görüntüsünü OpenCV ile işle
-            cv_sketch = np.array(sketch)#numpy arraya çevir.
-            # Keskinleştirme ve eşikleme (Lazer için saf siyah-beyaz çizgi)
-            _, line_art_np = cv2.threshold(cv_sketch, 110, 255, cv2.THRESH_BINARY)
-            line_art = Image.fromarray(line_art_np)
-            
-            self.res = {
-                "gray": gri, #gri tonlama
-                "gray_d": dither,# dither modu
-                "sketch": sketch,# eskiz modu 
-                "line_art": line_art # yeni line art modu
-            }
-            
-            for k, lbl in self.panels.items():#görselleri panelde gösterir.
-                im = self.res[k].copy(); im.thumbnail((550, 450))# Görseli panel boyutuna göre sınırlar
-                tk_im = ImageTk.PhotoImage(im);# Label üzerine resmi basar
-                lbl.config(image=tk_im); lbl.image = tk_im # Çöp toplayıcısının (Garbage Collector) resmi silmemesi için referans tutar
-            self.info.config(text=f"> STATUS: READY\n> SIZE: {px_w}x{px_h}\n> ENGINE: V3.7_LINE_ART")
-        except Exception as e: print(e)
+            params = self.current_params()
+        except (ValueError, tk.TclError) as e:# geçersiz alan değeri: panelde gösterilir ve günlüğe yazılır
+            self.report_error("render_params", e); return None
+        if final: self.ensure_resolution(params)
+        return self.orig_img, params
+
+    def ensure_resolution(self, params):# final çıktı kırpmadaki pikselden fazlasını istiyorsa kaynak daha büyük ölçekte yeniden kırpılır
+        pl = self.placement
+        if not pl or pl["scale"] >= 1.0 or self.source is None: return
+        w = laser_engine.output_size(self.orig_img, params["w_mm"], params["dpi"])[0]
+        if w <= self.orig_img.width: return
+        img, pl["scale"] = laser_engine.crop_source(self.source, pl, w)
+        self.orig_img = img.convert("RGBA")
+
+    def run_render(self, *args, **kwargs):# Pipeline.render (profil açıksa cProfile altında)
+        if self.profiler: return self.profiler.run(self.pipeline.render, *args, **kwargs)
+        return self.pipeline.render(*args, **kwargs)
+
+    def render_job(self, job, cancel, kind="preview"):# işçi thread: panel boyutunda önizleme (proxy) render'ı
+        img, params = job
+        hit = self.prefetch.get(job) if kind == "preview" else None
+        if hit is not None:# preset arka planda hazırlanmıştı
+            stats = laser_engine.RenderStats("prefetched"); stats.hit("preset")
+            return hit[0], hit[1], stats, params
+        stats = laser_engine.RenderStats(kind)
+        render = self.run_render if kind == "preview" else self.pipeline.render# profil sadece ön plan
+        res = render(img, params, cancel, fit=laser_engine.PREVIEW_FIT, stats=stats)
+        # panel görselleri de havuzda hazırlanır; PhotoImage Tk thread'inde kalmalı (show_result)
+        size = laser_engine.output_size(img, params["w_mm"], params["dpi"])
+        return self.pipeline.thumbnails(res), size, stats, params
+
+    def show_result(self, result, err=None):# ana thread: en yeni önizlemeyi panellere basar
+        if err is not None:
+            self.report_error("process", err); return
+        self.preview_res, size, stats, params = result
+        for k, lbl in self.panels.items():#görselleri panelde gösterir.
+            tk_im = ImageTk.PhotoImage(self.preview_res[k]);# Label üzerine resmi basar
+            lbl.config(image=tk_im); lbl.image = tk_im # Çöp toplayıcısının (Garbage Collector) resmi silmemesi için referans tutar
+        final = "READY" if self.final_params == self.current_params() else "PREVIEW"
+        self.show_stats(final, size, stats)
+        laser_engine.log_event(self.log, stats.as_dict(size=size, params=params))
+        self.prefetch.schedule(self.preset_jobs(params))# boşta diğer presetler hazırlanır
+
+    def show_stats(self, status, size, stats):# ANALYSIS paneli: süre, önbellek ve en yavaş aşamalar
+        lines = [f"> STATUS: {status}", f"> SIZE: {size[0]}x{size[1]}",
+                 f"> {stats.kind.upper()}: {stats.total * 1000:.0f} ms",
+                 f"> CACHE: {stats.hits} HIT ({stats.disk_hits} DISK) {stats.misses} MISS {self.pipeline.cache.nbytes / 2**20:.0f}MB"]
+        lines += ["  " + l for l in stats.lines(5)]
+        self.info.config(text="\n".join(lines + ["> ENGINE: V3.7_LINE_ART"]))
+
+    def log_error(self, where, err):# traceback konsola ve günlüğe (her thread'den çağrılabilir)
+        tb = "".join(traceback.format_exception(type(err), err, err.__traceback__))
+        print(tb)
+        laser_engine.log_event(self.log, {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "kind": "error", "where": where,
+                                          "error": f"{type(err).__name__}: {err}", "traceback": tb})
+
+    def report_error(self, where, err):# hata yutulmaz: panelde gösterilir, traceback günlüğe yazılır
+        self.log_error(where, err)
+        self.info.config(text=f"> STATUS: ERROR\n> {where.upper()}: {type(err).__name__}\n> {str(err)[:80]}\n> ENGINE: V3.7_LINE_ART")
+
+    def render_final(self):# tam çözünürlük render'ı - sadece kayıt ya da RENDER FINAL ile
+        job = self.render_params(final=True)
+        if job is None: return False
+        img, params = job
+        if self.final_params != params:
+            self.root.config(cursor="watch"); self.root.update_idletasks()
+            try:
+                stats = laser_engine.RenderStats("final")
+                self.res = self.run_render(img, params, stats=stats)
+                self.final_params, self.final_stats = params, stats
+                laser_engine.log_event(self.log, stats.as_dict(size=self.res["gray"].size, params=params))
+            except Exception as e:
+                self.report_error("render_final", e); return False
+            finally:
+                self.root.config(cursor="")
+        self.show_stats("READY", self.res["gray"].size, self.final_stats)
+        return True
 
     def save(self, key):
-        if key in self.res:
-            p = filedialog.asksaveasfilename(defaultextension=".png")
-            if p: self.res[key].save(p, dpi=(int(self.dpi_var.get() or 250),)*2); messagebox.showinfo("OK", f"{key.upper()} EXPORTED")
+        job = self.render_params(final=True)
+        if key in laser_engine.MODES and job and laser_engine.use_tiled(*job):
+            return self.save_tiled(key, *job)
+        if key in laser_engine.MODES and self.render_final():
+            p = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png"), ("TIFF", "*.tif *.tiff")])
+            if not p: return
+            fmt = "tiff" if p.lower().endswith((".tif", ".tiff")) else "png"
+            laser_engine.save_output(self.res[key], p, key, self.final_params["dpi"], fmt)
+            messagebox.showinfo("OK", f"{key.upper()} EXPORTED")
+
+    def save_tiled(self, key, img, params):# çok büyük çıktı: belleğe almadan şerit şerit dosyaya yazar
+        p = filedialog.asksaveasfilename(defaultextension=".png")
+        if not p: return
+        self.root.config(cursor="watch"); self.root.update_idletasks()
+        try:
+            px_w, px_h = laser_engine.render_tiled(img, params, {key: p}, faces=self.pipeline.face_boxes(img))
+        except Exception as e:
+            self.report_error("save_tiled", e); return
+        finally:
+            self.root.config(cursor="")
+        self.info.config(text=f"> STATUS: TILED EXPORT\n> SIZE: {px_w}x{px_h}\n> ENGINE: V3.7_LINE_ART")
+        messagebox.showinfo("OK", f"{key.upper()} EXPORTED")
+
+    def save_gcode(self):# seçili çıktı -> .gcode (çok büyük çıktılar şerit şerit, belleğe alınmadan)
+        key, job = self.gcode_var.get(), self.render_params(final=True)
+        if job is None: return
+        img, params = job
+        opts = laser_engine.gcode_options(self.material_var.get())
+        tiled = laser_engine.use_tiled(img, params)
+        if not tiled and not self.render_final(): return
+        p = filedialog.asksaveasfilename(defaultextension=".gcode", filetypes=[("G-code", "*.gcode *.nc")])
+        if not p: return
+        self.root.config(cursor="watch"); self.root.update_idletasks()
+        try:
+            if tiled:
+                size = laser_engine.output_size(img, params["w_mm"], params["dpi"])
+                w = laser_engine.GcodeWriter(p, size, key, params["dpi"], **opts)
+                laser_engine.render_tiled(img, params, {key: w}, faces=self.pipeline.face_boxes(img))
+                gjob = w.job
+            else:
+                gjob = laser_engine.export_gcode(p, self.res[key], key, params["dpi"], **opts)
+        except Exception as e:
+            self.report_error("save_gcode", e); return
+        finally:
+            self.root.config(cursor="")
+        t, naive = gjob.estimate()
+        est = f"{laser_engine.format_time(t)} (FULL SCAN {laser_engine.format_time(naive)})"
+        self.info.config(text=f"> STATUS: G-CODE\n> TIME: {est}\n> ENGINE: V3.7_LINE_ART")
+        messagebox.showinfo("OK", f"{key.upper()} G-CODE EXPORTED\nEST. TIME: {est}")
+
+    def save_vector(self):# line_art -> SVG/DXF (kontür + sadeleştirme + kesim sırası optimizasyonu)
+        job = self.render_params(final=True)
+        if job is None: return
+        img, params = job
+        tiled = laser_engine.use_tiled(img, params)
+        if not tiled and not self.render_final(): return
+        p = filedialog.asksaveasfilename(defaultextension=".svg", filetypes=[("SVG", "*.svg"), ("DXF", "*.dxf")])
+        if not p: return
+        self.root.config(cursor="watch"); self.root.update_idletasks()
+        try:
+            if tiled:# çok büyük çıktı: line_art önce şeritli olarak geçici klasöre yazılır (hata olsa da silinir)
+                with tempfile.TemporaryDirectory(prefix="laser_vector_") as tmp_dir:
+                    tmp = os.path.join(tmp_dir, "line_art.png")
+                    laser_engine.render_tiled(img, params, {"line_art": tmp}, faces=self.pipeline.face_boxes(img))
+                    with Image.open(tmp) as line_art:
+                        r = laser_engine.export_vector(p, line_art, params["w_mm"])
+            else:
+                r = laser_engine.export_vector(p, self.res["line_art"], params["w_mm"])
+        except Exception as e:
+            self.report_error("save_vector", e); return
+        finally:
+            self.root.config(cursor="")
+        self.info.config(text=f"> STATUS: VECTOR\n> PATHS: {r['paths']}\n> CUT: {r['cut_mm'] / 1000:.2f} m"
+                              f"\n> TRAVEL: {r['travel_mm'] / 1000:.2f} -> {r['travel_opt_mm'] / 1000:.2f} m\n> ENGINE: V3.7_LINE_ART")
+        messagebox.showinfo("OK", "LINE ART VECTOR EXPORTED")
+
+    def export_all(self):# seçili çıktılar -> klasör (arka plan thread'i, ilerleme çubuğu)
+        keys = [k for k in laser_engine.MODES if self.export_vars[k].get()]
+        if not keys or self.exporter.running: return
+        job = self.render_params(final=True)
+        if job is None: return
+        d = filedialog.askdirectory()
+        if not d: return
+        path = self.source.path if self.source is not None else None
+        stem = os.path.splitext(os.path.basename(path))[0] if path else "laser"
+        res = self.res if self.final_params == job[1] else None# RENDER FINAL sonucu hazırsa yeniden hesaplanmaz
+        self.exporter.start(job, keys, d, stem, self.export_fmt.get(), res)
+        self.info.config(text=f"> STATUS: EXPORTING {len(keys)}\n> ENGINE: V3.7_LINE_ART")
+
+    def export_job(self, step, job, keys, out_dir, stem, fmt, res):# işçi thread: render + yazma
+        img, params = job
+        t0 = time.perf_counter()
+        size = laser_engine.output_size(img, params["w_mm"], params["dpi"])
+        stats = None
+        if laser_engine.use_tiled(img, params):# çok büyük çıktı: şeritli, her zaman PNG
+            paths = {k: os.path.join(out_dir, f"{stem}_{k}.png") for k in keys}
+            step(0, size[1] * len(keys))
+            rows = RowCounter(step)
+            faces = self.pipeline.face_boxes(img)# dedektör Pipeline'ın kilidiyle (önizleme thread'leriyle paylaşılır)
+            laser_engine.render_tiled(img, params, {k: [p, rows] for k, p in paths.items()}, faces=faces)
+        else:
+            ext = "tif" if fmt == "tiff" else "png"
+            paths = {k: os.path.join(out_dir, f"{stem}_{k}.{ext}") for k in keys}
+            step(0, len(keys) + (res is None))
+            if res is None:
+                stats = laser_engine.RenderStats("final")
+                res = self.pipeline.render(img, params, stats=stats)
+                step()
+            for k, p in paths.items():
+                laser_engine.save_output(res[k], p, k, params["dpi"], ext); step()
+        return paths, size, time.perf_counter() - t0, (img, res, params, stats)
+
+    def show_export_progress(self, frac):# ana thread
+        self.export_bar["value"] = frac
+
+    def export_done(self, result, err=None):# ana thread
+        if err is not None:
+            self.report_error("export_all", err); return
+        paths, size, seconds, (img, res, params, stats) = result
+        if stats is not None and img is self.orig_img:# yeni final render: sonraki kayıtlar yeniden hesaplamaz
+            self.res, self.final_params, self.final_stats = res, params, stats
+            laser_engine.log_event(self.log, stats.as_dict(size=size, params=params))
+        mb = sum(os.path.getsize(p) for p in paths.values()) / 2**20
+        self.info.config(text=f"> STATUS: EXPORTED {len(paths)}\n> SIZE: {size[0]}x{size[1]}\n> FILES: {mb:.1f} MB"
+                              f"\n> TIME: {seconds:.1f}s\n> ENGINE: V3.7_LINE_ART")
+        messagebox.showinfo("OK", "EXPORTED:\n" + "\n".join(os.path.basename(p) for p in paths.values()))
 
     def validate_numeric(self, P):
     # Eğer kutu boşaltılıyorsa izin ver
@@ -548,15 +974,11 @@ class LazerMasterCyber:
             self.active_panel_key = key
 
     
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = LazerMasterCyber(root)
-    root.mainloop()
-
 if __name__ == "__main__":
     try:
-        app = LazerMasterCyber() # Sizin sınıf adınız
-        app.mainloop()
+        root = tk.Tk()
+        app = LazerMasterCyber(root)
+        root.mainloop()
     except Exception as e:
         print(f"KRİTİK HATA: {e}")
         input("Kapatmak için Enter'a basın...") # Konsolun hemen kapanmaması için
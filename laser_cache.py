@@ -0,0 +1,147 @@
+# emergent1 LASER MASTER - oturumlar arası disk önbelleği
+# İçerik adresli: anahtar, giriş piksellerinin blake2b özeti + aşamanın parametreleridir.
+# Resimler PNG, yüz kutuları JSON olarak saklanır. Toplam boyut sınırı aşılınca en eski
+# kullanılan (mtime) dosyalar silinir. Yazma geçici dosya + os.replace ile atomiktir;
+# aynı klasörü paylaşan birden fazla uygulama/süreç birbirinin yarım dosyasını görmez.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+def default_dir():# LASER_CACHE ortam değişkeni, yoksa ~/.laser_master/cache; LASER_CACHE="" kapatır
+    return os.environ.get("LASER_CACHE", os.path.join(os.path.expanduser("~"), ".laser_master", "cache"))
+
+
+def image_digest(img):# resmin içerik özeti (mod + boyut + pikseller)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{img.mode} {img.width}x{img.height}".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def key_digest(key):# aşama anahtarı (iç içe tuple: str/int/float/bool) -> dosya adı
+    return hashlib.blake2b(repr(key).encode(), digest_size=20).hexdigest()
+
+
+class DiskCache:
+    # max_bytes: klasörün toplam boyut sınırı; background: yazma arka plan thread'inde (GUI)
+    # on_error: yazma hatası (disk dolu, izin) -> on_error(hata); yoksa "laser.cache" logger'ına
+    def __init__(self, root=None, max_bytes=2 * 2**30, background=True, compress_level=1, on_error=None):
+        self.root = default_dir() if root is None else root
+        self.on_error = on_error
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="laser_cache") if background else None
+        self._lock = threading.Lock()
+        self._nbytes = None  # klasör boyutu tahmini (ilk yazmada taranır)
+
+    def _path(self, name, ext):
+        return os.path.join(self.root, name[:2], name + ext)
+
+    def get(self, key):# -> PIL Image, tuple ya da None
+        name = key_digest(key)
+        for ext in (".png", ".json"):
+            path = self._path(name, ext)
+            try:
+                if ext == ".png":
+                    with Image.open(path) as value:
+                        value.load()
+                else:
+                    with open(path, encoding="utf-8") as f:
+                        value = tuple(tuple(v) for v in json.load(f))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, SyntaxError):# bozuk dosya: ıskalama sayılır, silinir
+                self._remove(path); continue
+            try:
+                os.utime(path)# LRU: son kullanım
+            except OSError:
+                pass
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):# değer değişmez kabul edilir (önbellekteki aşama çıktısı)
+        if not self.root: return
+        name = key_digest(key)
+        if self._writer is not None:
+            self._writer.submit(self._write, name, value)
+        else:
+            self._write(name, value)
+
+    def _write(self, name, value):
+        is_img = isinstance(value, Image.Image)
+        path = self._path(name, ".png" if is_img else ".json")
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if is_img:
+                value.save(tmp, "PNG", compress_level=self.compress_level)
+            else:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump([list(v) for v in value], f)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except OSError as e:# önbellek isteğe bağlı: render sürer, hata raporlanır
+            self._remove(tmp)
+            if self.on_error: self.on_error(e)
+            else: logging.getLogger("laser.cache").warning("önbellek yazılamadı: %s", e, exc_info=e)
+            return
+        with self._lock:
+            self._nbytes = None if self._nbytes is None else self._nbytes + size
+        self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _scan(self):# -> [(mtime, boyut, yol)]
+        files = []
+        try:
+            dirs = [d.path for d in os.scandir(self.root) if d.is_dir()]
+        except FileNotFoundError:
+            return files
+        for d in dirs:
+            try:
+                for e in os.scandir(d):
+                    try:
+                        st = e.stat()
+                    except FileNotFoundError:# başka bir süreç sildi
+                        continue
+                    files.append((st.st_mtime, st.st_size, e.path))
+            except FileNotFoundError:
+                continue
+        return files
+
+    def evict(self):# sınır aşıldıysa en eski kullanılanlar silinir (sınırın %90'ına kadar)
+        with self._lock:
+            if self._nbytes is not None and self._nbytes <= self.max_bytes: return
+            files = self._scan()
+            total = sum(s for _, s, _ in files)
+            if total > self.max_bytes:
+                for mtime, size, path in sorted(files):
+                    if path.endswith(".tmp") and mtime > time.time() - 3600: continue# yazılmakta olan (başka süreç)
+                    self._remove(path); total -= size
+                    if total <= self.max_bytes * 0.9: break
+            self._nbytes = total
+
+    def flush(self):# bekleyen yazmaları bitirir
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._scan(): self._remove(path)
+            self._nbytes = 0
@@ -0,0 +1,168 @@
+# emergent1 LASER MASTER - dither motoru
+# gray_d çıktısı için eşik matrisli (Bayer, blue-noise) ve hata yaymalı (Floyd-Steinberg,
+# Jarvis, Stucki, Atkinson, serpentine) algoritmalar. Hepsi numpy ile, resim ya da şerit bazında.
+import functools
+
+from PIL import Image
+import numpy as np
+
+
+DITHER_METHODS = ("floyd-steinberg", "atkinson", "jarvis", "stucki", "serpentine", "bayer", "blue-noise")
+
+# hata yayma çekirdekleri: bölen, ((dy, dx, ağırlık), ...) - (0, 0) işlenen piksel
+KERNELS = {"floyd-steinberg": (16, ((0, 1, 7), (1, -1, 3), (1, 0, 5), (1, 1, 1))),
+           "jarvis": (48, ((0, 1, 7), (0, 2, 5),
+                           (1, -2, 3), (1, -1, 5), (1, 0, 7), (1, 1, 5), (1, 2, 3),
+                           (2, -2, 1), (2, -1, 3), (2, 0, 5), (2, 1, 3), (2, 2, 1))),
+           "stucki": (42, ((0, 1, 8), (0, 2, 4),
+                           (1, -2, 2), (1, -1, 4), (1, 0, 8), (1, 1, 4), (1, 2, 2),
+                           (2, -2, 1), (2, -1, 2), (2, 0, 4), (2, 1, 2), (2, 2, 1))),
+           # Atkinson hatanın sadece 6/8'ini dağıtır (daha kontrastlı, açık tonlar temiz kalır)
+           "atkinson": (8, ((0, 1, 1), (0, 2, 1), (1, -1, 1), (1, 0, 1), (1, 1, 1), (2, 0, 1)))}
+
+
+def bayer_matrix(n=8):# n x n Bayer eşik sırası (0..n*n-1), n: 2'nin kuvveti
+    m = np.zeros((1, 1), np.int32)
+    while m.shape[0] < n:
+        m = np.block([[4*m, 4*m + 2], [4*m + 3, 4*m + 1]])
+    return m
+
+
+@functools.lru_cache(maxsize=None)
+def blue_noise_matrix(n=64, sigma=1.5, seed=7):# void-and-cluster ile n x n blue-noise sırası (bir kez üretilir)
+    d = np.minimum(np.arange(n), n - np.arange(n))# halka (toroidal) mesafe: desen kenarsız döşenir
+    kern = np.exp(-(d[:, None]**2 + d[None, :]**2) / (2 * sigma**2))
+    rank = np.zeros(n * n, np.int32)
+    pts = np.random.RandomState(seed).rand(n * n) < 0.1
+    energy = np.zeros(n * n)
+
+    def splat(i, sign):# i noktasının enerjisini tüm desene ekler/çıkarır
+        energy[:] += sign * np.roll(kern, (i // n, i % n), (0, 1)).ravel()
+
+    for i in np.flatnonzero(pts): splat(i, 1)
+    while True:# başlangıç desenini dengele: en sık kümeyi en büyük boşluğa taşı
+        c = np.argmax(np.where(pts, energy, -np.inf)); pts[c] = False; splat(c, -1)
+        v = np.argmin(np.where(pts, np.inf, energy)); pts[v] = True; splat(v, 1)
+        if c == v: break
+    ones = int(pts.sum())
+    p, e = pts.copy(), energy.copy()
+    for r in range(ones - 1, -1, -1):# 1. faz: kümeler sırayla çıkarılır
+        c = np.argmax(np.where(p, energy, -np.inf)); p[c] = False; splat(c, -1); rank[c] = r
+    energy[:] = e
+    for r in range(ones, n * n):# 2. faz: boşluklar sırayla doldurulur
+        v = np.argmin(np.where(pts, np.inf, energy)); pts[v] = True; splat(v, 1); rank[v] = r
+    return rank.reshape(n, n)
+
+
+MATRICES = {"bayer": lambda: bayer_matrix(8), "blue-noise": blue_noise_matrix}
+
+
+def ordered(arr, matrix, y0=0):# eşik matrisiyle dither (tek numpy karşılaştırması); y0: şeridin resimdeki satırı
+    n_y, n_x = matrix.shape
+    th = (matrix + 0.5) * (255.0 / matrix.size)
+    rows = th[(y0 + np.arange(arr.shape[0])) % n_y]
+    return arr > np.tile(rows, (1, -(-arr.shape[1] // n_x)))[:, :arr.shape[1]]
+
+
+class ErrorDiffusion:# hata yaymalı dither; şerit şerit beslenebilir, hata şerit sınırından taşınır
+    # Çekirdek anti-diyagonal dalga cephesiyle işlenir: t = a*y + x aynı olan pikseller
+    # birbirinden bağımsızdır, tek adımda (düz bellekte sabit adımlı bir görünüm) işlenir.
+    # Adım sayısı a*H + W olur (piksel başına Python döngüsü yok).
+    # Floyd-Steinberg Pillow'un convert("1") tamsayı aritmetiğiyle birebir aynıdır (ağırlıklı
+    # hata toplamı tam sayı, /16 sıfıra doğru kesilir, eşik > 128): tek parça (Pillow) ve
+    # şeritli (bu sınıf) gray_d aynı çıkar.
+    def __init__(self, method, width):
+        div, taps = KERNELS[method]
+        self.width = width
+        self.pad = max(abs(dx) for _, dx, _ in taps)
+        self.depth = max(dy for dy, _, _ in taps)
+        self.a = max([1] + [-dx // dy + 1 for dy, dx, _ in taps if dy > 0])
+        self.exact = method == "floyd-steinberg"
+        self.div = div
+        self.taps = [(dy, dx, w if self.exact else w / div) for dy, dx, w in taps]
+        self.carry = np.zeros((self.depth, width + 2 * self.pad), np.int32 if self.exact else np.float32)
+
+    def feed(self, rows):# rows: (n, width) uint8 -> (n, width) bool (True = beyaz)
+        n, W = rows.shape
+        P, a, D = self.pad, self.a, self.depth
+        Wp = W + 2 * P
+        # hata ayrı tamponda birikir: şeritli ve tek parça işlemde toplama sırası aynı kalır
+        err = np.zeros((n + D, Wp), self.carry.dtype)
+        err[:D] = self.carry
+        img = np.zeros((n + D, Wp), np.uint8)
+        img[:n, P:P + W] = rows
+        out = np.zeros(err.shape, bool)
+        flat, iflat, oflat = err.ravel(), img.ravel(), out.ravel()
+        s = Wp - a
+        groups = {}# aynı ağırlıklı komşular gruplanır: adım başına ağırlık sayısı kadar çarpma
+        for dy, dx, w in self.taps: groups.setdefault(w, []).append(dy * Wp + dx)
+        groups = list(groups.items())
+        for t in range(a * (n - 1) + W):
+            y_lo, y_hi = max(0, -(-(t - W + 1) // a)), min(n - 1, t // a)
+            start = P + t + y_lo * s
+            stop = start + (y_hi - y_lo) * s + 1
+            e = flat[start:stop:s]
+            if self.exact:
+                e = np.sign(e) * (np.abs(e) // self.div)# C tamsayı bölmesi (sıfıra doğru)
+                v = np.clip(e + iflat[start:stop:s], 0, 255)
+                q = v > 128
+            else:
+                v = np.clip(e + iflat[start:stop:s], 0, 255)
+                q = v >= 128
+            oflat[start:stop:s] = q
+            v -= 255 * q
+            for w, offs in groups:
+                ew = v * w
+                for off in offs: flat[start + off:stop + off:s] += ew
+        self.carry = err[n:].copy()
+        return out[:n, P:P + W]
+
+
+class Serpentine:# yönü satır satır değişen Floyd-Steinberg (yön artefaktı yok, en yavaş yol)
+    # Satır içi hata bir sonraki piksele zincirlendiği için paralel değil: satır Python'da
+    # taranır, alt satıra yayılan hata ise satır bitince tek numpy işlemiyle eklenir.
+    def __init__(self, width):
+        self.carry = np.zeros(width + 2, np.float32)
+        self.y = 0
+
+    def feed(self, rows):
+        n, W = rows.shape
+        out = np.zeros((n, W), bool)
+        for i in range(n):
+            rev = (self.y + i) % 2 == 1
+            cur = (rows[i].astype(np.float32) + self.carry[1:-1])
+            if rev: cur = cur[::-1]
+            vals, errs, q = cur.tolist(), [0.0] * W, [False] * W
+            c = 0.0
+            for x in range(W):
+                v = vals[x] + c
+                v = 0.0 if v < 0 else 255.0 if v > 255 else v
+                if v >= 128: q[x] = True; v -= 255
+                errs[x] = v; c = v * 0.4375
+            e = np.array(errs, np.float32)
+            nxt = np.zeros(W + 2, np.float32)
+            nxt[:-2] += e * 0.1875; nxt[1:-1] += e * 0.3125; nxt[2:] += e * 0.0625
+            if rev: nxt = nxt[::-1]
+            self.carry = nxt
+            out[i] = q[::-1] if rev else q
+        self.y += n
+        return out
+
+
+class Ditherer:# bir algoritmayla şerit şerit dither (render_tiled); durumu bir sonraki şeride taşır
+    def __init__(self, method, width):
+        self.method, self.y = method, 0
+        if method in MATRICES: self.impl = None; self.matrix = MATRICES[method]()
+        elif method == "serpentine": self.impl = Serpentine(width)
+        else: self.impl = ErrorDiffusion(method, width)
+
+    def feed(self, rows):
+        out = ordered(rows, self.matrix, self.y) if self.impl is None else self.impl.feed(rows)
+        self.y += rows.shape[0]
+        return out
+
+
+def dither(gray, method="floyd-steinberg"):# L resim -> "1" resim
+    if method == "floyd-steinberg":
+        return gray.convert("1")# Pillow'un C Floyd-Steinberg'i (tek parça resimde en hızlısı)
+    return Image.fromarray(Ditherer(method, gray.width).feed(np.asarray(gray)))
@@ -0,0 +1,1158 @@
+# emergent1 LASER MASTER - headless motor (Tk'siz)
+# Gri / dither / sketch / line art boru hattı burada; GUI ve CLI aynı kodu kullanır.
+import argparse
+import glob
+import importlib
+import json
+import math
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, ImageFilter
+import numpy as np
+
+try:
+    import resource# Unix; Windows'ta yok (tepe bellek raporlanmaz)
+except ImportError:
+    resource = None
+
+import laser_cache
+import laser_dither
+from laser_dither import DITHER_METHODS
+from laser_gcode import BINARY_MODES, GCODE_MODES, GcodeWriter, export_gcode, format_time
+import laser_vector
+from laser_vector import VECTOR_FORMATS, export_vector
+
+
+class _LazyImport:# ağır modülü ilk kullanımda yükler (GUI açılış süresi için)
+    def __init__(self, name):
+        self._name = name
+        self._mod = None
+
+    def __getattr__(self, attr):
+        if self._mod is None:
+            self._mod = importlib.import_module(self._name)
+        return getattr(self._mod, attr)
+
+
+cv2 = _LazyImport("cv2")
+
+
+MODES = ("gray", "gray_d", "sketch", "line_art")
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+EXPORT_FORMATS = ("png", "tiff")
+
+# materyal: (parlaklık, kontrast, sketch derinliği, bg cleaner, yüz yumuşatma)
+PRESETS = {"WOOD": (0.9, 1.15, 35, 11, 5),
+           "DEFAULT": (1.0, 1.0, 25, 45, 5),
+           "METAL": (0.9, 1.0, 35, 76, 5),
+           "STONE": (1.3, 0.75, 35, 100, 5)}
+# materyale göre gray_d algoritması (bkz. laser_dither.DITHER_METHODS)
+PRESET_DITHER = {"WOOD": "jarvis", "DEFAULT": "floyd-steinberg", "METAL": "bayer", "STONE": "atkinson"}
+# materyale göre G-code güç aralığı (S min, S max; GRBL $30=1000 ölçeği) - gri tonlar bu aralığa yayılır
+PRESET_POWER = {"WOOD": (80, 650), "DEFAULT": (0, 1000), "METAL": (400, 1000), "STONE": (200, 900)}
+
+# önizleme (proxy) render'ı panel boyutunda yapılır; yüz tespiti ise daha büyük bir kopyada
+PREVIEW_FIT = (550, 450)
+FACE_DETECT_FIT = (1600, 1600)
+
+# sketch blur'u ve bg cleaner eşiği için algoritmalar (bkz. gaussian_blur, _bg_clean_np)
+BLUR_METHODS = ("auto", "pillow", "gaussian", "box", "pyramid")
+EXACT_BLUR_PIXELS = 10**6  # "auto": bundan küçük resimlerde (önizleme) Pillow'un blur'u, ~20 ms altı
+THRESHOLD_METHODS = ("gaussian", "mean")
+
+# GUI sürgülerinin açılış değerleri
+DEFAULT_PARAMS = {"bright": 1.2, "contrast": 0.95, "sketch": 25, "bg": 51, "face_blur": 5,
+                  "invert": False, "w_mm": 100.0, "dpi": 250.0,
+                  "blur": "auto", "threshold": "gaussian", "dither": "floyd-steinberg"}
+
+
+def preset_params(mat, **overrides):#materyal presetini parametre sözlüğüne çevirir.
+    b, c, s, bg, d = PRESETS[mat]
+    params = dict(DEFAULT_PARAMS, bright=b, contrast=c, sketch=s, bg=bg, face_blur=d, dither=PRESET_DITHER[mat])
+    params.update(overrides)
+    return params
+
+
+def gcode_options(mat, **overrides):# materyal presetinden RasterGcode seçenekleri
+    opts = {"power": PRESET_POWER[mat]}
+    opts.update(overrides)
+    return opts
+
+
+def output_size(img, w_mm, dpi):# mm + DPI -> piksel (yükseklik orana göre)
+    ratio = img.width / img.height
+    px_w = int((float(w_mm) / 25.4) * float(dpi))
+    return px_w, int(px_w / ratio)
+
+
+def default_workers():# LASER_WORKERS ile ayarlanır; varsayılan: en fazla 4 thread
+    try:
+        return max(1, int(os.environ["LASER_WORKERS"]))
+    except (KeyError, ValueError):
+        return min(4, os.cpu_count() or 1)
+
+
+def fit_size(size, box):# size'ı box içine sığdırır (asla büyütmez) -> (w, h), ölçek
+    w, h = size
+    scale = min(1.0, box[0] / w, box[1] / h)
+    return (max(1, int(round(w * scale))), max(1, int(round(h * scale)))), scale
+
+
+# EXIF yönü (0x0112) -> transpose; 5-8 genişlik/yükseklik yer değiştirir
+EXIF_TRANSPOSE = {2: Image.Transpose.FLIP_LEFT_RIGHT, 3: Image.Transpose.ROTATE_180, 4: Image.Transpose.FLIP_TOP_BOTTOM,
+                  5: Image.Transpose.TRANSPOSE, 6: Image.Transpose.ROTATE_270, 7: Image.Transpose.TRANSVERSE,
+                  8: Image.Transpose.ROTATE_90}
+
+
+class SourceImage:
+    # Kaynak resim: açılışta sadece başlık (boyut + EXIF yönü) okunur. decode(size) size'ı
+    # kaplayan en küçük ölçeği çözer: JPEG'de draft (1/2, 1/4, 1/8 DCT ölçekli çözme), diğer
+    # formatlarda tam çözme + reduce(). Tam çözünürlük ancak gerekince bir kez çözülür ve saklanır.
+    # Boyutlar ve çıktılar EXIF yönü uygulanmış, RGBA.
+    def __init__(self, src):# src: dosya yolu ya da PIL Image
+        self.path, self._full, self.orientation = None, None, 1
+        if isinstance(src, Image.Image):
+            img = ImageOps.exif_transpose(src)
+            self._full = img if img.mode == "RGBA" else img.convert("RGBA")
+            self.size = self._full.size
+            return
+        self.path = src
+        with Image.open(src) as im:
+            self.orientation = im.getexif().get(0x0112, 1)
+            w, h = im.size
+        self.size = (h, w) if self.orientation in (5, 6, 7, 8) else (w, h)
+
+    @property
+    def width(self): return self.size[0]
+
+    @property
+    def height(self): return self.size[1]
+
+    def _finish(self, im):# yön + RGBA; çözme with bloğu içinde biter (dosya kapanınca da geçerli)
+        im.load()# RGBA + yön 1'de im olduğu gibi döner: tembel açılmış resim burada çözülmeli
+        if self.orientation in EXIF_TRANSPOSE: im = im.transpose(EXIF_TRANSPOSE[self.orientation])
+        return im if im.mode == "RGBA" else im.convert("RGBA")
+
+    def full(self):
+        if self._full is None:
+            with Image.open(self.path) as im:
+                self._full = self._finish(im)
+        return self._full
+
+    def decode(self, size=None):# -> en az size (w, h) kadar büyük RGBA; None: tam çözünürlük
+        if size is None or self._full is not None or size[0] * 2 > self.width or size[1] * 2 > self.height:
+            return self.full()
+        w, h = (size[1], size[0]) if self.orientation in (5, 6, 7, 8) else size
+        with Image.open(self.path) as im:
+            im.draft(im.mode, (w, h))# JPEG dışında etkisiz
+            f = min(im.width // w, im.height // h)
+            if f >= 2: im = (im if im.mode in ("L", "RGB", "RGBA") else im.convert("RGBA")).reduce(f)
+            return self._finish(im)
+
+
+class RenderCancelled(Exception):# eski (artık geçersiz) bir render yarıda bırakıldı
+    pass
+
+
+def _checkpoint(cancel):# aşamalar arasında iptal kontrolü
+    if cancel is not None and cancel():
+        raise RenderCancelled()
+
+
+def _file_id(path):# (mutlak yol, boyut, mtime): aynı isimle değiştirilen model dosyası da ayırt edilir
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (os.path.abspath(path),)
+    return (os.path.abspath(path), st.st_size, int(st.st_mtime))
+
+
+class HaarFaceDetector:# varsayılan: OpenCV Haar cascade
+    def __init__(self, path=None):
+        # Cascade Dosyası Kontrolü: önce yerel dosya, yoksa OpenCV'nin kendi kopyası
+        local_path = "haarcascade_frontalface_default.xml"
+        if path is None:
+            path = local_path if os.path.exists(local_path) else cv2.data.haarcascades + local_path
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty(): raise ValueError(f"cascade yüklenemedi: {path}")
+        self.spec = ("haar", _file_id(path))# disk önbelleği anahtarı: dosya değişirse kutular yeniden bulunur
+
+    def detect(self, rgb):
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        return self.cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))
+
+
+class DnnFaceDetector:
+    # OpenCV DNN yüz modeli (örn. res10_300x300_ssd .caffemodel + .prototxt ya da
+    # aynı çıktıyı veren .onnx), yerel dosyadan. Çıktı: [_, _, güven, x1, y1, x2, y2] (0..1)
+    def __init__(self, model, config="", confidence=0.5, input_size=(300, 300)):
+        self.net = cv2.dnn.readNet(model, config)
+        self.confidence = confidence
+        self.input_size = input_size
+        self.spec = ("dnn", _file_id(model), _file_id(config) if config else "", confidence, tuple(input_size))
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        blob = cv2.dnn.blobFromImage(bgr, 1.0, self.input_size, (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        out = self.net.forward().reshape(-1, 7)
+        faces = []
+        for conf, x1, y1, x2, y2 in out[:, 2:7]:
+            if conf < self.confidence: continue
+            x1, x2 = int(max(0, x1) * w), int(min(1, x2) * w)
+            y1, y2 = int(max(0, y1) * h), int(min(1, y2) * h)
+            if x2 > x1 and y2 > y1: faces.append((x1, y1, x2 - x1, y2 - y1))
+        return faces
+
+
+def make_face_detector(spec=None):
+    # spec: None/"haar" | "haar:dosya.xml" | "dnn:model[,config]" | "none"
+    # GUI'de LASER_FACE_DETECTOR ortam değişkeninden, CLI'de --face-detector'dan gelir.
+    kind, _, arg = (spec or "haar").partition(":")
+    try:
+        if kind == "none": return None
+        if kind == "haar": return HaarFaceDetector(arg or None)
+        if kind == "dnn":
+            model, _, config = arg.partition(",")
+            return DnnFaceDetector(model, config)
+    except (cv2.error, ValueError) as e:
+        print(f"yüz dedektörü yüklenemedi ({spec}): {e}", file=sys.stderr)
+        return None
+    raise ValueError(f"bilinmeyen yüz dedektörü: {spec}")
+
+
+def _odd(v):# Gaussian çekirdekleri tek sayı olmalı
+    v = max(1, int(v))
+    return v if v % 2 != 0 else v + 1
+
+
+def detect_faces(pil_img, detector):# yüz kutuları (x, y, w, h), pil_img koordinatlarında
+    if not detector: return ()
+    return tuple(tuple(int(v) for v in f) for f in detector.detect(np.asarray(pil_img.convert("RGB"))))
+
+
+def source_faces(img, detector):
+    # Yüzler kaynak başına bir kez, FACE_DETECT_FIT'e küçültülmüş kopyada aranır;
+    # kutular kaynak koordinatlarında döner, scale_boxes ile her çıktı boyutuna taşınır.
+    if not detector: return ()
+    det_size, scale = fit_size(img.size, FACE_DETECT_FIT)
+    small = img if scale == 1.0 else img.resize(det_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return scale_boxes(detect_faces(small, detector), det_size, img.size)
+
+
+def clean_faces(pil_img, faces, face_blur):# yüz bölgelerini blurlaştırır
+    # sadece yüz kutuları numpy'ye geçer; tam resmin RGB kopyası tek (convert), bölgeler yerine yapıştırılır
+    if not faces: return pil_img
+    out = pil_img.convert("RGB")
+    b_val = _odd(face_blur)
+    for (x, y, w, h) in faces:
+        box = (x, y, min(x + w, out.width), min(y + h, out.height))
+        if box[2] <= x or box[3] <= y: continue
+        roi = np.array(out.crop(box))
+        out.paste(Image.fromarray(cv2.GaussianBlur(roi, (b_val, b_val), 0, dst=roi)), box[:2])
+    return out
+
+
+def scale_boxes(faces, src_size, dst_size):# yüz kutularını başka bir çözünürlüğe taşır
+    sx = dst_size[0] / src_size[0]; sy = dst_size[1] / src_size[1]
+    return tuple((int(round(x*sx)), int(round(y*sy)), max(1, int(round(w*sx))), max(1, int(round(h*sy))))
+                 for (x, y, w, h) in faces)
+
+
+def _blend_lut(lut, factor, degenerate=0.0):
+    # Image.blend(degenerate, img, factor) formülü (Pillow: float32, kesme + 0..255 sınırı)
+    x = np.float32(degenerate) + np.float32(factor) * (lut.astype(np.float32) - np.float32(degenerate))
+    return np.clip(x, 0, 255).astype(np.uint8)
+
+
+def enhance_lut(bright=1.0, contrast=1.0, mean=None):
+    # ImageEnhance.Brightness + Contrast zincirinin 256 girişlik tablo hali.
+    # mean: parlaklık uygulanmış resmin L ortalaması (Contrast'ın gri seviyesi)
+    lut = _blend_lut(np.arange(256), bright)
+    if mean is None: return lut
+    return _blend_lut(lut, contrast, mean)
+
+
+def adjust_mean(arr, bright=1.0):
+    # ImageEnhance.Contrast'ın kullandığı ortalama: parlaklık uygulanmış resmin L
+    # ortalaması. Büyük resimde seyrek örnekleme yeterli (±1 seviye).
+    step = max(1, int((arr.shape[0] * arr.shape[1] / 262144) ** 0.5))
+    sample = cv2.LUT(np.ascontiguousarray(arr[::step, ::step, :3]), enhance_lut(bright))
+    return int(cv2.mean(cv2.cvtColor(sample, cv2.COLOR_RGB2GRAY))[0] + 0.5)
+
+
+def adjust_colors(img, bright=1.0, contrast=1.0, sat=1.0, mean=None):
+    # Editörün Brightness + Contrast + Color ayarları tek tabloda ve tek karışımda:
+    # parlaklık/kontrast bir LUT geçişi, doygunluk tek bir addWeighted (L ile karışım).
+    # Sonuç ImageEnhance zincirinden en fazla 1-2 seviye farklıdır. Alfa korunur.
+    arr = np.array(img.convert("RGBA"))
+    if bright == 1.0 and contrast == 1.0 and sat == 1.0: return Image.fromarray(arr, "RGBA")
+    if mean is None: mean = adjust_mean(arr, bright)
+    lut = np.empty((1, 256, 4), np.uint8)
+    lut[0, :, :3] = enhance_lut(bright, contrast, mean)[:, None]; lut[0, :, 3] = np.arange(256)
+    cv2.LUT(arr, lut, dst=arr)
+    if sat != 1.0:
+        gray = cv2.cvtColor(arr, cv2.COLOR_RGBA2GRAY)
+        degen = cv2.merge((gray, gray, gray, arr[..., 3]))
+        cv2.addWeighted(arr, sat, degen, 1.0 - sat, 0, dst=arr)
+    return Image.fromarray(arr, "RGBA")
+
+
+def rotate_matrix(size, angle):# Image.rotate(angle, expand=True) ile aynı affine tablo + genişlemiş boyut
+    w, h = size
+    a = -math.radians(angle % 360.0)
+    m = [round(math.cos(a), 15), round(math.sin(a), 15), 0.0, round(-math.sin(a), 15), round(math.cos(a), 15), 0.0]
+    tr = lambda x, y: (m[0] * x + m[1] * y + m[2], m[3] * x + m[4] * y + m[5])
+    m[2], m[5] = tr(-w / 2, -h / 2)
+    m[2] += w / 2; m[5] += h / 2
+    xs, ys = zip(*(tr(x, y) for x, y in ((0, 0), (w, 0), (w, h), (0, h))))
+    nw, nh = math.ceil(max(xs)) - math.floor(min(xs)), math.ceil(max(ys)) - math.floor(min(ys))
+    m[2], m[5] = tr(-(nw - w) / 2.0, -(nh - h) / 2.0)
+    return m, (nw, nh)
+
+
+def rotated_size(size, angle):
+    return rotate_matrix(size, angle)[1]
+
+
+def crop_rotated(img, angle, box, adjust=None):
+    # img.rotate(angle, expand=True).crop(box) ile aynı dönüşüm (yuvarlama sınırında tek tük piksel
+    # farkı), ama sadece kutunun kaynaktaki karşılığı (+2 px pay) işlenir. adjust: döndürmeden önce o bölgeye uygulanır (renk ayarı).
+    # -> (kırpılmış RGBA, kaynaktaki bölge (x0, y0, x1, y1))
+    (a, b, c, d, e, f), _ = rotate_matrix(img.size, angle)
+    x1, y1, x2, y2 = box
+    c, f = a * x1 + b * y1 + c, d * x1 + e * y1 + f# çıktının (0, 0)'ı kaynakta
+    w, h = x2 - x1, y2 - y1
+    xs, ys = zip(*((a * x + b * y + c, d * x + e * y + f) for x, y in ((0, 0), (w, 0), (w, h), (0, h))))
+    src = (max(0, math.floor(min(xs)) - 2), max(0, math.floor(min(ys)) - 2),
+           min(img.width, math.ceil(max(xs)) + 2), min(img.height, math.ceil(max(ys)) + 2))
+    if src[2] <= src[0] or src[3] <= src[1]:# kutu tamamen döndürmenin boş köşesinde
+        return Image.new("RGBA", (w, h)), src
+    part = img.crop(src)
+    if adjust: part = adjust(part)
+    return part.transform((w, h), Image.Transform.AFFINE, (a, b, c - src[0], d, e, f - src[1]),
+                          Image.Resampling.NEAREST), src
+
+
+def crop_source(source, placement, out_w=None):
+    # Editör kırpması (placement: box/rotation/adjust, tam çözünürlük tuvalinde) -> (RGBA, ölçek).
+    # Kaynak, kırpma en az out_w piksel genişlikte kalacak en küçük ölçekte çözülür (None: tam).
+    x1, y1, x2, y2 = placement["box"]
+    f = 1.0 if not out_w else min(1.0, out_w / (x2 - x1))
+    img = source.decode((math.ceil(source.width * f), math.ceil(source.height * f)))
+    f = img.width / source.width
+    angle = placement["rotation"]
+    if f < 1.0:# kutu küçük tuvale taşınır
+        cw, ch = rotated_size(img.size, angle)
+        x1, y1 = min(int(x1 * f), cw - 1), min(int(y1 * f), ch - 1)
+        x2, y2 = max(min(math.ceil(x2 * f), cw), x1 + 1), max(min(math.ceil(y2 * f), ch), y1 + 1)
+    bright, contrast, sat, mean = placement["adjust"]
+    out, _ = crop_rotated(img, angle, (x1, y1, x2, y2), lambda im: adjust_colors(im, bright, contrast, sat, mean=mean))
+    return out, f
+
+
+def _nbytes(obj):# önbellek için yaklaşık bellek boyutu
+    if isinstance(obj, Image.Image):
+        return obj.width * obj.height * len(obj.getbands())
+    return getattr(obj, "nbytes", 0)
+
+
+class StageCache:
+    # Aşama çıktıları için bayt sınırlı LRU önbellek. Anahtar, aşamanın adı +
+    # gerçekten bağlı olduğu parametrelerdir; sınır aşılınca en eski çıkarılır.
+    def __init__(self, max_bytes=768 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key); self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes: return
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size); self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, old) = self._items.popitem(last=False); self.nbytes -= old
+
+    def clear(self):
+        with self._lock:
+            self._items.clear(); self.nbytes = 0
+
+
+class BufferPool:
+    # Aşamaların geçici (ara) numpy tamponları: (thread, isim, şekil, tip) anahtarlı - her
+    # thread kendi tamponunu alır; aynı boyutta tekrarlanan render'larda yeniden ayrılmaz.
+    # Havuzdan alınan dizi bir sonraki aynı isimli istekte üzerine yazılır: önbelleğe giren
+    # aşama çıktıları havuzdan alınmaz. max_bytes: tüm thread'lerin toplamı (LRU); büyük bir
+    # final render'dan sonra dal/önizleme thread'leri ayrı ayrı tampon tutmaz.
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.allocs = 0
+        self.reuses = 0
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name, shape, dtype=np.uint8):
+        key = (threading.get_ident(), name, tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            buf = self._items.get(key)
+            if buf is not None:
+                self._items.move_to_end(key); self.reuses += 1
+                return buf
+        buf = np.empty(shape, dtype)
+        with self._lock:
+            self.allocs += 1
+            if buf.nbytes > self.max_bytes: return buf
+            self._items[key] = buf; self.nbytes += buf.nbytes
+            while self.nbytes > self.max_bytes:# çıkarılan tamponu kullanan thread'de dizi yaşamaya devam eder
+                _, old = self._items.popitem(last=False); self.nbytes -= old.nbytes
+        return buf
+
+    def clear(self):# tüm thread'lerin tamponları bırakılır
+        with self._lock:
+            self._items.clear(); self.nbytes = 0
+
+
+SCRATCH = BufferPool()
+
+
+def peak_rss_mb():# sürecin şimdiye kadarki tepe RSS'i (MB); Windows'ta None
+    if resource is None: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)# macOS bayt, Linux KB
+
+
+class RenderStats:
+    # Tek render'ın ölçümleri: yeniden hesaplanan aşamaların süresi ve çıktı boyutu
+    # (önbellekte tutulan tampon), önbellek isabet/ıskalama sayıları. Aşama başına gerçek tepe
+    # bellek ölçülmez: Pillow/OpenCV tamponları tracemalloc'a görünmez, dallar paralel çalıştığı
+    # için RSS farkı da aşamaya ayrılamaz. Aşama bellek alanı "out_mb" (çıktı boyutu); gerçek
+    # tepe, süreç düzeyinde "peak_rss_mb" olarak yazılır.
+    def __init__(self, kind="render"):
+        self.kind = kind
+        self.stages = {}   # aşama -> (sn, bayt)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0 # hits'in diskten (laser_cache) yüklenen kısmı
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, nbytes):
+        with self._lock:
+            self.stages[name] = (seconds, nbytes); self.misses += 1
+
+    def disk_hit(self, name, seconds, nbytes):# diskten yüklenen aşama: isabettir, süresi "<aşama>.disk"
+        with self._lock:
+            self.stages[name + ".disk"] = (seconds, nbytes); self.hits += 1; self.disk_hits += 1
+
+    def hit(self, name):
+        with self._lock:
+            self.hits += 1
+
+    @property
+    def times(self):# {aşama: sn}
+        return {k: t for k, (t, _) in self.stages.items()}
+
+    def as_dict(self, **extra):# JSON satırı için
+        d = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "kind": self.kind, "total_ms": round(self.total * 1000, 2),
+             "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+             "peak_rss_mb": peak_rss_mb(),
+             "stages": {k: {"ms": round(t * 1000, 2), "out_mb": round(b / 2**20, 2)} for k, (t, b) in self.stages.items()}}
+        d.update(extra)
+        return d
+
+    def lines(self, top=6):# bilgi paneli için en yavaş aşamalar
+        worst = sorted(self.stages.items(), key=lambda kv: -kv[1][0])[:top]
+        return [f"{k[:9]:9s}{t * 1000:7.1f}ms out{b / 2**20:5.1f}MB" for k, (t, b) in worst]
+
+
+def render_log(path=None, max_bytes=5 * 2**20, backups=3):# JSON satırlı, dönen (rotating) render günlüğü
+    # path: LASER_LOG ortam değişkeni, yoksa ~/.laser_master/render.jsonl; LASER_LOG="" kapatır
+    import logging
+    import logging.handlers
+    if path is None:
+        path = os.environ.get("LASER_LOG", os.path.join(os.path.expanduser("~"), ".laser_master", "render.jsonl"))
+    log = logging.getLogger("laser.render")
+    log.propagate = False
+    if path and not log.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler); log.setLevel(logging.INFO)
+    return log
+
+
+def log_event(log, record):# dict -> tek JSON satırı
+    log.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+class SlowestProfiler:
+    # İsteğe bağlı (LASER_PROFILE): render'lar cProfile altında çalışır, oturumun en yavaş
+    # render'ının profili dosyaya yazılır (python -m pstats / snakeviz ile açılır).
+    # cProfile sadece çağıran thread'i izler; profil açıkken Pipeline tek thread çalışmalı.
+    def __init__(self, path):
+        self.path = path
+        self.slowest = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, **kwargs):
+        import cProfile
+        if not self._lock.acquire(blocking=False):# aynı anda tek profil (önizleme + final çakışırsa)
+            return fn(*args, **kwargs)
+        try:
+            prof = cProfile.Profile()
+            t0 = time.perf_counter()
+            out = prof.runcall(fn, *args, **kwargs)
+            dt = time.perf_counter() - t0
+            if dt > self.slowest:
+                self.slowest = dt
+                prof.dump_stats(self.path)
+            return out
+        finally:
+            self._lock.release()
+
+
+class _Lazy:# değer ilk istendiğinde bir kez hesaplanır (iki dal aynı anda isteyebilir)
+    def __init__(self, fn):
+        self.fn, self.done, self.value = fn, False, None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if not self.done: self.value, self.done = self.fn(), True
+            return self.value
+
+
+class Pipeline:
+    # Boru hattı küçük bir bağımlılık grafiği olarak çalışır:
+    #   resize -> faces -> luma -> tone -> bgclean -> sketch -> line_art
+    #                          \-> gray -> dither
+    # Her aşama kendi parametreleriyle önbelleğe alınır; örn. SKETCH DEPTH
+    # değişince sadece sketch ve line_art yeniden hesaplanır.
+    # luma'dan sonraki iki dal (gri ve sketch) birbirinden bağımsızdır ve küçük bir
+    # thread havuzunda aynı anda çalışır (Pillow/OpenCV çağrıları GIL'i bırakır).
+    # disk (laser_cache.DiskCache) verilirse kaynak, piksel özetiyle anahtarlanır; yüz kutuları ve
+    # tam çözünürlükte yüz temizlenmiş taban + dört çıktı oturumlar arası diskte saklanır.
+    def __init__(self, face_detector=None, cache_bytes=768 * 2**20, workers=None, disk=None):
+        self.face_detector = face_detector
+        self.cache = StageCache(cache_bytes)
+        self.disk = disk
+        self.workers = default_workers() if workers is None else workers
+        self._pool = None
+        self._src = None
+        self._src_id = 0     # kaynak sayacı (bellek önbelleği)
+        self._src_key = None # aşama anahtarlarındaki kaynak: sayaç ya da diskte ("img", piksel özeti)
+        self._lock = threading.Lock()
+        self._detect_lock = threading.Lock()
+
+    def map(self, fn, items):# işleri havuzda paralel çalıştırır (workers <= 1 ise sırayla)
+        items = list(items)
+        if self.workers <= 1 or len(items) < 2:
+            return [fn(it) for it in items]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="laser")
+        futures = [self._pool.submit(fn, it) for it in items]
+        return [f.result() for f in futures]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False); self._pool = None
+
+    def thumbnails(self, res, box=PREVIEW_FIT):# panel görselleri (küçültme paralel; PhotoImage Tk thread'inde)
+        def prep(im):
+            if im.width > box[0] or im.height > box[1]:# thumbnail() gibi ama önce tam boy kopya yok
+                im = im.resize(fit_size(im.size, box)[0], Image.Resampling.BICUBIC, reducing_gap=2.0)
+            im.load()
+            return im
+        return dict(zip(res, self.map(prep, res.values())))
+
+    def _source_key(self, img):# yeni kaynak resim gelince eski aşamalar geçersiz
+        with self._lock:
+            if img is not self._src:
+                self._src_id += 1
+                # disk önbelleğinde kaynak içerikle tanınır (kırpma ve editör ayarları piksellerde)
+                self._src_key = ("img", laser_cache.image_digest(img)) if self.disk is not None else self._src_id
+                self.cache.clear()
+                self._src = img# anahtar hazır olduktan sonra: özet hata verirse eski kaynak geçerli kalmaz
+            return self._src_key
+
+    def _detect(self, img):# dedektör aynı anda tek thread'den kullanılır (önizleme + final)
+        with self._detect_lock:
+            return source_faces(img, self.face_detector)
+
+    def _boxes_key(self, src):# dedektörün spec'i (model dosyası, güven eşiği); yoksa sınıf adı
+        d = self.face_detector
+        return ("face_boxes", src, getattr(d, "spec", None) or type(d).__name__)
+
+    def _face_boxes(self, img, src, cancel=None, stats=None):
+        return self._stage(self._boxes_key(src), lambda: self._detect(img), cancel, stats, self.disk is not None)
+
+    def face_boxes(self, img, cancel=None, stats=None):# kaynak koordinatlarında yüz kutuları (render_tiled'ın faces'i)
+        return self._face_boxes(img, self._source_key(img), cancel, stats)
+
+    def _stage(self, key, fn, cancel, stats=None, persist=False, deps=()):
+        # persist: disk önbelleğine de bakılır/yazılır; deps: fn'in kullandığı tembel üst aşamalar
+        # (süresi bu aşamaya katılmasın diye önce hesaplanır)
+        out = self.cache.get(key)
+        if out is None:
+            _checkpoint(cancel)
+            disk = self.disk if persist else None
+            t0 = time.perf_counter()
+            out = disk.get(key) if disk is not None else None
+            if out is not None:
+                if stats is not None: stats.disk_hit(key[0], time.perf_counter() - t0, _nbytes(out))
+            else:
+                for d in deps: d()
+                t0 = time.perf_counter()
+                out = fn()
+                if disk is not None: disk.put(key, out)
+                if stats is not None: stats.record(key[0], time.perf_counter() - t0, _nbytes(out))
+            self.cache.put(key, out)
+        elif stats is not None:
+            stats.hit(key[0])
+        return out
+
+    def render(self, img, params, cancel=None, fit=None, stats=None):# resim + parametre -> dört çıktı (PIL Image)
+        # cancel: True dönerse render aşama aralarında RenderCancelled ile kesilir
+        # fit: (w, h) verilirse önizleme (proxy) modu - aynı boru hattı panel
+        #      boyutunda çalışır; blur yarıçapı, eşik bloğu ve yüz kutuları ölçeklenir.
+        # stats: RenderStats verilirse aşama süreleri, boyutları ve önbellek isabetleri yazılır
+        t0 = time.perf_counter()
+        src = self._source_key(img)
+        full = output_size(img, params["w_mm"], params["dpi"])
+        size, scale = fit_size(full, fit) if fit else (full, 1.0)
+        bright, contrast, inv = params["bright"], params["contrast"], bool(params["invert"])
+        face_blur = _odd(int(params["face_blur"]) * scale)
+        block = _odd(int(11 + params["bg"]//5*2) * scale)
+        radius = params["sketch"] * scale
+        blur = params.get("blur", "auto"); th_method = params.get("threshold", "gaussian")
+        keep = self.disk is not None and scale == 1.0# önizleme (proxy) aşamaları diske yazılmaz
+
+        # yüz kutuları kaynak başına bir kez bulunur; boyut/DPI/FACE SMOOTH değişince
+        # sadece önbellekteki bölgeler yeniden blurlaştırılır
+        # Üst aşamalar tembeldir: sadece bir alt aşama önbellekte (bellek/disk) yoksa hesaplanır;
+        # örn. dört çıktı diskteyse resize ve yüz araması hiç yapılmaz.
+        k_boxes = self._boxes_key(src)
+        boxes = _Lazy(lambda: self._face_boxes(img, src, cancel, stats))
+        k_resize = ("resize", src, size)
+        resized = _Lazy(lambda: self._stage(k_resize, lambda: img.resize(size, Image.Resampling.LANCZOS), cancel, stats))
+        k_faces = ("faces", k_resize, k_boxes, face_blur)
+        work = _Lazy(lambda: self._stage(k_faces, lambda: clean_faces(resized(), scale_boxes(boxes(), img.size, size), face_blur),
+                                         cancel, stats, keep, (resized, boxes)))
+        k_luma = ("luma", k_faces)
+        luma = _Lazy(lambda: self._stage(k_luma, lambda: work().convert("L"), cancel, stats, deps=(work,)))
+        hist = _Lazy(lambda: self._stage(("hist", k_luma), lambda: luma().histogram(), cancel, stats, deps=(luma,)))# iki ton tablosu için tek geçiş
+
+        def gray_branch():
+            k_gray = ("gray", k_luma, bright, contrast, inv)
+            gri = self._stage(k_gray, lambda: _gray_tone(luma(), hist(), bright, contrast, inv), cancel, stats, keep,
+                              (luma, hist))
+            method = params.get("dither", "floyd-steinberg")
+            dither = self._stage(("dither", k_gray, method), lambda: laser_dither.dither(gri, method), cancel, stats, keep)
+            return {"gray": gri, "gray_d": dither}
+
+        def sketch_branch():
+            k_tone = ("tone", k_luma, bright, contrast, inv)
+            base = _Lazy(lambda: self._stage(k_tone, lambda: _base_tone(luma(), hist(), bright, contrast, inv), cancel, stats,
+                                             deps=(luma, hist)))
+            k_bg = ("bgclean", k_tone, params["bg"], block, th_method)
+            gray = _Lazy(lambda: self._stage(k_bg, lambda: _bg_clean(base(), params["bg"], block, th_method), cancel, stats,
+                                             deps=(base,)))
+            k_sketch = ("sketch", k_bg, radius, blur)
+            sketch = self._stage(k_sketch, lambda: _sketch(gray(), radius, blur), cancel, stats, keep, (gray,))
+            line_art = self._stage(("line_art", k_sketch), lambda: _line_art(sketch), cancel, stats, keep)
+            return {"sketch": sketch, "line_art": line_art}
+
+        g, sk = self.map(lambda branch: branch(), (gray_branch, sketch_branch))
+        if stats is not None: stats.total = time.perf_counter() - t0
+        return {**g, **sk}
+
+
+# Gri dalı: sürgü değerleri varsayılan artışla birleştirilir (sürgü 1.0 -> default görünüm)
+DEFAULT_BRIGHT = 1.0
+DEFAULT_CONTRAST = 1.5
+
+
+def tone_lut(hist, bright, contrast, invert):
+    # Brightness + Contrast (+ invert) zincirinin birebir 256 girişlik tablosu.
+    # Contrast'ın ihtiyaç duyduğu ortalama (parlaklık uygulanmış resmin ortalaması)
+    # kaynak histogramından tam olarak hesaplanır; resmin üzerinden ayrıca geçilmez.
+    b_lut = enhance_lut(bright)
+    hist = np.asarray(hist, dtype=np.float64)
+    mean = int(float(b_lut.astype(np.float64) @ hist) / max(1.0, hist.sum()) + 0.5)
+    lut = enhance_lut(bright, contrast, mean)
+    return 255 - lut if invert else lut
+
+
+def _base_tone(luma, hist, bright, contrast, invert):# sketch dalının tabanı: sürgü değerleri
+    return luma.point(tone_lut(hist, bright, contrast, invert).tolist())
+
+
+def _gray_tone(luma, hist, bright, contrast, invert):
+    return luma.point(tone_lut(hist, DEFAULT_BRIGHT * bright, DEFAULT_CONTRAST * contrast, invert).tolist())
+
+
+def pick_blur(sigma, pixels, method="auto"):# "auto": yarıçap ve resim boyutuna göre algoritma
+    # pyramid (sketch farkı maks. 6 seviye) otomatik seçilmez; sadece blur="pyramid" ile
+    if method != "auto": return method
+    if pixels < EXACT_BLUR_PIXELS: return "pillow"# küçük resim: referans blur zaten ucuz
+    if sigma < 2.5: return "gaussian"          # küçük çekirdek: gerçek ayrık Gaussian ucuz
+    return "box"
+
+
+def gaussian_blur(arr, sigma, method="auto", dst=None):
+    # uint8 tek kanal Gaussian blur (dst: sonuç için hazır tampon; pillow hariç oraya yazılır):
+    #   pillow   - ImageFilter.GaussianBlur (referans)
+    #   gaussian - OpenCV ayrık Gaussian; küçük sigma için
+    #   box      - 3 ardışık kutu filtresi; maliyet yarıçaptan bağımsız (Pillow'la ±3 seviye)
+    #   pyramid  - küçült, blur, büyüt; büyük sigma + büyük resim için (sadece açıkça istenirse)
+    method = pick_blur(sigma, arr.size, method)
+    if sigma <= 0:
+        if dst is None: return arr.copy()
+        np.copyto(dst, arr); return dst
+    if method == "pillow":
+        return np.asarray(Image.fromarray(arr).filter(ImageFilter.GaussianBlur(sigma)))
+    if method == "gaussian":
+        return cv2.GaussianBlur(arr, (0, 0), sigma, dst=dst, borderType=cv2.BORDER_REPLICATE)
+    if method == "pyramid":
+        h, w = arr.shape
+        f = int(min(8, max(2, 2 ** math.floor(math.log2(sigma / 4)))))
+        small = (max(1, h // f), max(1, w // f))
+        small = cv2.resize(arr, small[::-1], dst=SCRATCH.get("pyr", small), interpolation=cv2.INTER_AREA)
+        blurred = gaussian_blur(small, sigma / f, "box", SCRATCH.get("pyr_blur", small.shape))
+        return cv2.resize(blurred, (w, h), dst=dst, interpolation=cv2.INTER_LINEAR)
+    k = int(round(math.sqrt(4 * sigma * sigma + 1))); k += 1 - k % 2# 3 geçişte varyans ~ sigma^2
+    # geçişler dst ile havuzdaki tek ara tampon arasında gidip gelir (geçiş başına ayırma yok)
+    out = np.empty_like(arr) if dst is None else dst
+    tmp = SCRATCH.get("box", arr.shape)
+    cv2.blur(arr, (k, k), dst=out, borderType=cv2.BORDER_REPLICATE)
+    cv2.blur(out, (k, k), dst=tmp, borderType=cv2.BORDER_REPLICATE)
+    return cv2.blur(tmp, (k, k), dst=out, borderType=cv2.BORDER_REPLICATE)
+
+
+def _bg_clean_luts(strg):
+    # eşik 0 ve 255 olan pikseller için iki karışım tablosu: v*(1-s) + th*s formülü
+    # 256 girişte float64 ile hesaplanır (tam resimde float64 ara dizi yok, sonuç birebir aynı)
+    v, s = np.arange(256, dtype=np.float64), strg / 100
+    return (v*(1-s)).astype(np.uint8), (v*(1-s) + 255*s).astype(np.uint8)
+
+
+def _bg_clean_np(np_img, strg, block, method="gaussian"):# bg cleaner: adaptif eşik ile karışım (numpy)
+    # "mean": kutu ortalaması (integral resim eşdeğeri), blok boyutundan bağımsız maliyet
+    kind = cv2.ADAPTIVE_THRESH_MEAN_C if method == "mean" else cv2.ADAPTIVE_THRESH_GAUSSIAN_C
+    th = cv2.adaptiveThreshold(np_img, 255, kind, cv2.THRESH_BINARY, max(3, block), 5,
+                               dst=SCRATCH.get("bg_th", np_img.shape))
+    lo, hi = _bg_clean_luts(strg)
+    out = cv2.LUT(np_img, lo)
+    cv2.copyTo(cv2.LUT(np_img, hi, dst=SCRATCH.get("bg_hi", np_img.shape)), th, out)# eşik 255 olan yerler
+    return out
+
+
+def _bg_clean(base, strg, block, method="gaussian"):
+    return Image.fromarray(_bg_clean_np(np.asarray(base), strg, block, method))
+
+
+def _sketch_pre(gray, radius, method="pillow"):# kontrast öncesi sketch: gri + bulanık negatifin karışımı
+    # uint8 dizi döner; hızlı yollarda havuz tamponudur (sadece okunur, saklanmaz)
+    method = pick_blur(radius, gray.width * gray.height, method)
+    if method == "pillow":
+        inv = ImageOps.invert(gray)
+        return np.asarray(Image.blend(gray, inv.filter(ImageFilter.GaussianBlur(radius)), 0.3))
+    g = np.asarray(gray)
+    neg = cv2.bitwise_not(g, dst=SCRATCH.get("neg", g.shape))
+    blurred = gaussian_blur(neg, radius, method, SCRATCH.get("blur", g.shape))
+    return cv2.addWeighted(g, 0.7, blurred, 0.3, -0.49, dst=SCRATCH.get("pre", g.shape))# -0.49: Pillow'daki gibi aşağı yuvarla
+
+
+def _sketch_lut(hist):# ImageEnhance.Contrast(sketch).enhance(3.0) tablosu
+    return tone_lut(hist, 1.0, 3.0, False)
+
+
+def _sketch(gray, radius, method="pillow"):
+    pre = _sketch_pre(gray, radius, method)
+    return Image.fromarray(cv2.LUT(pre, _sketch_lut(Image.fromarray(pre).histogram())))
+
+
+def _line_art_np(sketch_np):# sketch eşiklenir (lazer için saf siyah-beyaz çizgi)
+    _, line_art_np = cv2.threshold(sketch_np, 110, 255, cv2.THRESH_BINARY)
+    return line_art_np
+
+
+def _line_art(sketch):
+    return Image.fromarray(_line_art_np(np.asarray(sketch)))
+
+
+def render(img, params, face_detector=None, cancel=None, workers=None, disk=None):# tek seferlik render (bellek önbelleksiz)
+    p = Pipeline(face_detector, cache_bytes=0, workers=workers, disk=disk)
+    try:
+        return p.render(img, params, cancel)
+    finally:
+        p.close()
+
+
+def accuracy_report(img, params, face_detector=None):
+    # Hızlı blur/eşik yollarının referansa (Pillow GaussianBlur + Gaussian adaptif eşik)
+    # göre sapması: sketch için seviye farkı, line_art için değişen piksel oranı.
+    t0 = time.perf_counter()
+    ref = render(img, dict(params, blur="pillow", threshold="gaussian"), face_detector)
+    t1 = time.perf_counter()
+    fast = render(img, params, face_detector)
+    t2 = time.perf_counter()
+    report = {"size": ref["sketch"].size, "ref_s": t1 - t0, "fast_s": t2 - t1}
+    for k in ("sketch", "line_art"):
+        d = np.abs(np.asarray(ref[k], np.int16) - np.asarray(fast[k], np.int16))
+        report[k] = {"mean_abs": float(d.mean()), "max_abs": int(d.max()), "changed": float((d > 0).mean())}
+    return report
+
+
+# ================= TILED (ŞERİTLİ) RENDER =================
+# Çok büyük çıktılar (999 mm @ 999 DPI ~ 39000 px) tek parça belleğe sığmaz.
+# render_tiled() resmi yatay şeritler halinde işler; her şerit blur/eşik
+# komşuluğunu kapsayacak kadar pay (halo) ile hesaplanır, böylece ekler görünmez.
+# Global istatistik isteyen iki adım (ton ve sketch kontrastı) için ara sonuçlar
+# diskteki geçici memmap'lere yazılır. Çıktılar şerit şerit PNG'ye akar; bellek
+# kullanımı resim boyutuyla değil şerit yüksekliğiyle ölçeklenir.
+TILE_ROWS = 1024
+TILED_MIN_PIXELS = 64 * 10**6  # bundan büyük çıktılar CLI/GUI'de şeritli yazılır
+
+
+class PngStripeWriter:
+    # Satır satır PNG yazıcı ("L" 8 bit ya da "1" paketli 1 bit). Pillow bütün
+    # resmi bellekte ister; bu yazıcı her şeridi sıkıştırıp hemen diske yazar.
+    def __init__(self, path, size, mode="L", dpi=None, level=6):
+        self.width, self.height = size
+        self.mode = mode
+        self.rows = 0
+        self._z = zlib.compressobj(level)
+        self._f = open(path, "wb")
+        self._f.write(b"\x89PNG\r\n\x1a\n")
+        depth = 1 if mode == "1" else 8
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, depth, 0, 0, 0, 0))
+        if dpi:
+            ppm = int(round(float(dpi) / 0.0254))
+            self._chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+    def _chunk(self, tag, data):
+        self._f.write(struct.pack(">I", len(data)) + tag + data)
+        self._f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff))
+
+    def write(self, rows):# rows: (n, width) uint8; "1" modunda 127 ve altı siyah, üstü beyaz
+        rows = np.asarray(rows, dtype=np.uint8)
+        if self.mode == "1":
+            rows = np.packbits(rows > 127, axis=1)
+            ftype = 0
+        else:# Sub filtresi: gri tonlarda sıkıştırmayı belirgin iyileştirir
+            rows = rows - np.pad(rows[:, :-1], ((0, 0), (1, 0)))
+            ftype = 1
+        data = np.empty((rows.shape[0], rows.shape[1] + 1), np.uint8)
+        data[:, 0] = ftype; data[:, 1:] = rows
+        out = self._z.compress(data.tobytes())
+        if out: self._chunk(b"IDAT", out)
+        self.rows += rows.shape[0]
+
+    def close(self):
+        if self._f.closed: return
+        self._chunk(b"IDAT", self._z.flush())
+        self._chunk(b"IEND", b"")
+        self._f.close()
+
+
+def tile_halo(face_blur, block, radius):
+    # Bir çıktı satırı için gereken komşu satır sayısı: yüz blur'u, adaptif eşik
+    # bloğu ve Pillow GaussianBlur'un (3 kutu geçişi, ~3 sigma) toplam erişimi.
+    return _odd(face_blur)//2 + max(3, block)//2 + int(math.ceil(3 * radius)) + 3
+
+
+def _clip_boxes(faces, y0, y1):# [y0, y1) şeridine düşen yüz kutuları, şerit koordinatlarında
+    out = []
+    for (x, y, w, h) in faces:
+        t, b = max(y, y0), min(y + h, y1)
+        if b > t: out.append((x, t - y0, w, b - t))
+    return out
+
+
+def _resize_rows(img, size, y0, y1):# tam resize'ın [y0, y1) satırları (LANCZOS, kaynak kutusuyla)
+    sy = img.height / size[1]
+    return img.resize((size[0], y1 - y0), Image.Resampling.LANCZOS, box=(0, y0 * sy, img.width, y1 * sy))
+
+
+def _stripe_sinks(outputs, size, dpi):# {mod: yol | yazıcı | liste} -> {mod: [yazıcılar]}
+    sinks = {}
+    for k, outs in outputs.items():
+        for o in (outs if isinstance(outs, (list, tuple)) else [outs]):
+            sinks.setdefault(k, []).append(o if hasattr(o, "write") else
+                                           PngStripeWriter(o, size, "1" if k in BINARY_MODES else "L", dpi))
+    return sinks
+
+
+def render_tiled(img, params, outputs, face_detector=None, tile_rows=TILE_ROWS, cancel=None, faces=None, stats=None):
+    # outputs: {mod: dosya yolu, write/close'lu yazıcı (ör. GcodeWriter) ya da bunların listesi}; faces: kaynak koordinatlarında hazır yüz kutuları (yoksa aranır)
+    # stats: RenderStats verilirse geçiş süreleri (faces, resize, gray, dither, sketch, line_art) yazılır
+    t_start = time.perf_counter()
+    times = {}
+    def timed(name, t0):# geçişler şerit şerit iç içe: süreler toplanır
+        t1 = time.perf_counter(); times[name] = times.get(name, 0.0) + t1 - t0
+        return t1
+    size = output_size(img, params["w_mm"], params["dpi"])
+    W, H = size
+    bright, contrast, inv = params["bright"], params["contrast"], bool(params["invert"])
+    face_blur = _odd(int(params["face_blur"])); block = _odd(int(11 + params["bg"]//5*2))
+    radius = params["sketch"]; strg = params["bg"]; th_method = params.get("threshold", "gaussian")
+    blur = pick_blur(radius, W * H, params.get("blur", "auto"))# şeritlerin hepsinde aynı algoritma
+    if blur == "pyramid": blur = "box"# piramit ızgarası şerit sınırında kayar
+    rf = face_blur // 2
+    rs = tile_halo(1, block, radius) - 1   # bg + blur erişimi (yüz hariç)
+    t = time.perf_counter()
+    if faces is None: faces = source_faces(img, face_detector)
+    faces = scale_boxes(faces, img.size, size)
+    timed("faces", t)
+    writers = _stripe_sinks(outputs, size, params["dpi"])
+
+    def emit(k, rows):
+        for w in writers[k]: w.write(rows)
+    stripes = [(y0, min(H, y0 + tile_rows)) for y0 in range(0, H, tile_rows)]
+    try:
+        with tempfile.TemporaryDirectory(prefix="laser_tiles_") as tmp:
+            luma = np.lib.format.open_memmap(os.path.join(tmp, "luma.npy"), "w+", np.uint8, (H, W))
+            hist = np.zeros(256, np.int64)
+            # A) resize + yüz temizleme + L -> memmap (+ histogram)
+            for y0, y1 in stripes:
+                _checkpoint(cancel)
+                t = time.perf_counter()
+                a0, a1 = max(0, y0 - rf), min(H, y1 + rf)
+                rows = _resize_rows(img, size, a0, a1)
+                local = _clip_boxes(faces, a0, a1)
+                if local: rows = clean_faces(rows, local, face_blur)
+                part = rows.crop((0, y0 - a0, W, y1 - a0)).convert("L")
+                luma[y0:y1] = np.asarray(part)
+                hist += part.histogram()
+                timed("resize", t)
+            base_lut = tone_lut(hist, bright, contrast, inv)
+            gray_lut = tone_lut(hist, DEFAULT_BRIGHT * bright, DEFAULT_CONTRAST * contrast, inv)
+
+            # B) gri/dither çıktıları + kontrast öncesi sketch -> memmap (+ histogram)
+            need_sketch = "sketch" in outputs or "line_art" in outputs
+            pre = np.lib.format.open_memmap(os.path.join(tmp, "pre.npy"), "w+", np.uint8, (H, W)) if need_sketch else None
+            s_hist = np.zeros(256, np.int64)
+            # hata yaymalı dither'da hata bir sonraki şeride taşınır (şerit sınırında iz kalmaz)
+            ditherer = laser_dither.Ditherer(params.get("dither", "floyd-steinberg"), W) if "gray_d" in writers else None
+            for y0, y1 in stripes:
+                _checkpoint(cancel)
+                t = time.perf_counter()
+                if "gray" in writers or "gray_d" in writers:
+                    gri = Image.fromarray(gray_lut[luma[y0:y1]])
+                    if "gray" in writers: emit("gray", np.asarray(gri))
+                    t = timed("gray", t)
+                    if ditherer: emit("gray_d", ditherer.feed(np.asarray(gri)) * np.uint8(255)); t = timed("dither", t)
+                if need_sketch:
+                    a0, a1 = max(0, y0 - rs), min(H, y1 + rs)
+                    gray = _bg_clean_np(base_lut[luma[a0:a1]], strg, block, th_method)
+                    part = _sketch_pre(Image.fromarray(gray), radius, blur)[y0 - a0:y1 - a0]
+                    pre[y0:y1] = part
+                    s_hist += Image.fromarray(part).histogram()
+                    timed("sketch", t)
+
+            # C) sketch kontrastı + line art
+            if need_sketch:
+                s_lut = _sketch_lut(s_hist)
+                for y0, y1 in stripes:
+                    _checkpoint(cancel)
+                    t = time.perf_counter()
+                    sk = s_lut[pre[y0:y1]]
+                    if "sketch" in writers: emit("sketch", sk)
+                    t = timed("sketch", t)
+                    if "line_art" in writers: emit("line_art", _line_art_np(sk)); timed("line_art", t)
+            del luma, pre
+    finally:
+        for ws in writers.values():
+            for w in ws: w.close()
+    if stats is not None:
+        for name, sec in times.items(): stats.record(name, sec, 0)
+        stats.total = time.perf_counter() - t_start
+    return size
+
+
+def save_output(img, path, key, dpi, fmt="png"):# çıktı -> PNG / TIFF, DPI gömülü
+    # Siyah-beyaz modlar (line_art, gray_d) paketli 1 bit yazılır: line_art 0/255 "L" olarak
+    # üretilir, dither'sız eşikle (127 üstü beyaz, PngStripeWriter ile aynı) "1"e çevrilir.
+    # TIFF: line_art CCITT Group 4 (uzun düz koşular), dither ve gri tonlar deflate
+    # (dither gürültüsünde Group 4 deflate'in ~2.7 katı yer tutar).
+    if key in BINARY_MODES and img.mode != "1":
+        img = img.point(lambda v: 255 if v > 127 else 0, "1")
+    dpi = (float(dpi), float(dpi))
+    if fmt in ("tif", "tiff"):
+        img.save(path, "TIFF", compression="group4" if key == "line_art" else "tiff_deflate", dpi=dpi)
+    else:
+        img.save(path, "PNG", dpi=dpi)
+    return path
+
+
+# ================= BATCH / CLI =================
+_worker_detector = None
+
+
+def _init_worker(detector_spec=None):# her işçi süreç yüz dedektörünü bir kez yükler
+    global _worker_detector
+    _worker_detector = make_face_detector(detector_spec)
+
+
+def use_tiled(img, params, tile_rows=None):# büyük çıktılar şeritli yazılır
+    w, h = output_size(img, params["w_mm"], params["dpi"])
+    return bool(tile_rows) or w * h >= TILED_MIN_PIXELS
+
+
+def render_job(path, params, out_dir, modes=MODES, tile_rows=None, threads=1, gcode=None, vector=None, cache=None,
+               fmt="png"):# tek bir dosya: yükle, işle, diske yaz
+    # gcode: RasterGcode seçenekleri (bkz. gcode_options) verilirse G-code modları için .gcode da yazılır
+    # vector: {"fmt": "svg"|"dxf", "tolerance_mm": ...} verilirse line_art vektör olarak da yazılır
+    # cache: disk önbelleği klasörü (laser_cache); aynı resim + parametreler yeniden hesaplanmaz
+    # fmt: "png" ya da "tiff" (şeritli işler her zaman PNG yazar)
+    t0 = time.perf_counter()
+    img = SourceImage(path).full()# EXIF yönü GUI'deki gibi uygulanır
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tiled = use_tiled(img, params, tile_rows)
+    ext = "tif" if fmt == "tiff" and not tiled else "png"
+    outputs = {k: os.path.join(out_dir, f"{stem}_{k}.{ext}") for k in modes}
+    g_paths = {k: os.path.join(out_dir, f"{stem}_{k}.gcode") for k in modes if gcode is not None and k in GCODE_MODES}
+    if tiled:
+        size = output_size(img, params["w_mm"], params["dpi"])
+        sinks = {k: GcodeWriter(p, size, k, params["dpi"], **gcode) for k, p in g_paths.items()}
+        render_tiled(img, params, {k: [p] + ([sinks[k]] if k in sinks else []) for k, p in outputs.items()},
+                     _worker_detector, tile_rows or TILE_ROWS)
+        jobs = {k: w.job for k, w in sinks.items()}
+        line_art = Image.open(outputs["line_art"]) if vector and "line_art" in outputs else None
+    else:
+        disk = laser_cache.DiskCache(cache, background=False) if cache else None
+        res = render(img, params, _worker_detector, workers=threads, disk=disk)
+        for k, out in outputs.items():
+            save_output(res[k], out, k, params["dpi"], ext)
+        size = res["gray"].size
+        jobs = {k: export_gcode(p, res[k], k, params["dpi"], **gcode) for k, p in g_paths.items()}
+        line_art = res["line_art"] if vector and "line_art" in outputs else None
+    times = {k: job.estimate() for k, job in jobs.items()}# G-code makine süresi tahmini (sn)
+    written = list(outputs.values()) + list(g_paths.values())
+    if line_art is not None:
+        opts = dict(vector); fmt = opts.pop("fmt")
+        v_path = os.path.join(out_dir, f"{stem}_line_art.{fmt}")
+        times["vector"] = export_vector(v_path, line_art, params["w_mm"], fmt, **opts)
+        written.append(v_path)
+    return path, size, written, time.perf_counter() - t0, times
+
+
+def collect_inputs(specs):# klasör, glob ya da dosya listesi -> sıralı dosya yolları
+    paths = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            found = [os.path.join(spec, f) for f in os.listdir(spec)]
+        else:
+            found = glob.glob(spec)
+        paths.extend(p for p in found if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTS))
+    return sorted(set(paths))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="emergent1 LASER MASTER - toplu (headless) işleme")
+    ap.add_argument("inputs", nargs="+", help="resim dosyaları, klasörler ya da glob desenleri")
+    ap.add_argument("-o", "--out", default="laser_out", help="çıktı klasörü")
+    ap.add_argument("--preset", default="DEFAULT", choices=sorted(PRESETS), help="materyal presetı")
+    ap.add_argument("--w-mm", type=float, default=DEFAULT_PARAMS["w_mm"], help="çıktı genişliği (mm)")
+    ap.add_argument("--dpi", type=float, default=DEFAULT_PARAMS["dpi"])
+    ap.add_argument("--invert", action="store_true")
+    ap.add_argument("--modes", default=",".join(MODES), help="virgülle ayrılmış: " + ",".join(MODES))
+    ap.add_argument("--tile-rows", type=int, default=None,
+                    help=f"şeritli (bellek sınırlı) işleme, şerit yüksekliği; {TILED_MIN_PIXELS // 10**6} MP üstü çıktılarda otomatik")
+    ap.add_argument("--blur", default="auto", choices=BLUR_METHODS, help="sketch blur algoritması")
+    ap.add_argument("--threshold", default="gaussian", choices=THRESHOLD_METHODS,
+                    help='bg cleaner adaptif eşiği ("mean": kutu ortalaması, daha hızlı)')
+    ap.add_argument("--dither", default=None, choices=DITHER_METHODS,
+                    help="gray_d algoritması (varsayılan: presetin algoritması)")
+    ap.add_argument("--gcode", action="store_true",
+                    help="line_art / gray_d / gray için raster G-code da yaz (güç aralığı presetten)")
+    ap.add_argument("--power", default=None, help='G-code güç aralığı "min,max" (S değeri; varsayılan: preset)')
+    ap.add_argument("--feed", type=float, default=3000, help="G-code yakma hızı (mm/dk)")
+    ap.add_argument("--overscan", type=float, default=0.0, help="satır başı/sonu hızlanma payı (mm)")
+    ap.add_argument("--unidirectional", action="store_true", help="G-code satırlarını tek yönde tara")
+    ap.add_argument("--vector", default=None, choices=VECTOR_FORMATS, help="line_art'ı vektör olarak da yaz")
+    ap.add_argument("--tolerance", type=float, default=0.05, help="vektör sadeleştirme toleransı (mm)")
+    ap.add_argument("--check-accuracy", action="store_true",
+                    help="render yerine seçili blur/eşik yollarını referansla karşılaştır")
+    ap.add_argument("--face-detector", default=None,
+                    help='"haar" (varsayılan), "haar:dosya.xml", "dnn:model[,config]" ya da "none"')
+    ap.add_argument("--threads", type=int, default=1,
+                    help="her iş için dal thread sayısı (süreçler zaten paralel; varsayılan 1)")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="işçi süreç sayısı (varsayılan: CPU sayısı)")
+    ap.add_argument("--format", default="png", choices=EXPORT_FORMATS,
+                    help="resim çıktıları: png ya da tiff (1 bit Group 4 / deflate); şeritli işler PNG")
+    ap.add_argument("--cache", default=None, metavar="DIR",
+                    help="kalıcı render önbelleği klasörü (GUI ile paylaşılabilir; varsayılan: kapalı)")
+    args = ap.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    bad = [m for m in modes if m not in MODES]
+    if bad: ap.error("bilinmeyen mod: " + ", ".join(bad))
+    paths = collect_inputs(args.inputs)
+    if not paths: ap.error("işlenecek resim bulunamadı")
+    params = preset_params(args.preset, w_mm=args.w_mm, dpi=args.dpi, invert=args.invert,
+                           blur=args.blur, threshold=args.threshold)
+    if args.dither: params["dither"] = args.dither
+    gcode = None
+    if args.gcode:
+        gcode = gcode_options(args.preset, feed=args.feed, overscan=args.overscan,
+                              bidirectional=not args.unidirectional)
+        if args.power: gcode["power"] = tuple(int(v) for v in args.power.split(","))
+    vector = {"fmt": args.vector, "tolerance_mm": args.tolerance} if args.vector else None
+    if args.check_accuracy:
+        detector = make_face_detector(args.face_detector)
+        for path in paths:
+            r = accuracy_report(SourceImage(path).full(), params, detector)
+            print(f"{path} {r['size'][0]}x{r['size'][1]}  ref {r['ref_s']:.2f}s  fast {r['fast_s']:.2f}s  "
+                  f"sketch ort/maks fark {r['sketch']['mean_abs']:.2f}/{r['sketch']['max_abs']}  "
+                  f"line_art değişen %{100 * r['line_art']['changed']:.3f}")
+        return 0
+    os.makedirs(args.out, exist_ok=True)
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    t0 = time.perf_counter(); failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.face_detector,)) as pool:
+        jobs = {pool.submit(render_job, p, params, args.out, modes, args.tile_rows, args.threads, gcode, vector,
+                                args.cache, args.format): p for p in paths}
+        for i, fut in enumerate(as_completed(jobs), 1):
+            try:
+                path, (w, h), _, dt, times = fut.result()
+                print(f"[{i}/{len(paths)}] {path} -> {w}x{h} ({dt:.2f}s)")
+                r = times.pop("vector", None)
+                for k, (t, naive) in times.items():
+                    print(f"    G-code {k}: ~{format_time(t)} (atlamasız tarama {format_time(naive)})")
+                if r: print("    vektör: " + laser_vector.format_report(r))
+            except Exception as e:
+                failed += 1
+                print(f"[{i}/{len(paths)}] HATA {jobs[fut]}: {e}", file=sys.stderr)
+    print(f"{len(paths) - failed}/{len(paths)} iş tamamlandı, {time.perf_counter() - t0:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
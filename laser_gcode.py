@@ -0,0 +1,129 @@
+# emergent1 LASER MASTER - raster G-code çıktısı
+# line_art / gray_d / gray çıktıları satır satır taranır: aynı güçteki komşu pikseller tek G1
+# segmenti olur, boş satırlar ve kenar boşlukları atlanır. Metin üretici (generator) ile
+# parça parça yazılır; iş ne kadar büyük olursa olsun bellekte tutulmaz.
+import math
+
+import numpy as np
+
+
+GCODE_MODES = ("line_art", "gray_d", "gray")
+BINARY_MODES = ("line_art", "gray_d")
+
+
+def power_lut(mode, power):# piksel değeri (0-255) -> S gücü; beyaz her zaman 0 (yakılmaz)
+    s_min, s_max = power
+    if mode in BINARY_MODES:
+        return np.where(np.arange(256) <= 127, s_max, 0).astype(np.int32)
+    lut = np.rint(s_min + (255 - np.arange(256)) * (s_max - s_min) / 255.0).astype(np.int32)
+    lut[255] = 0
+    return lut
+
+
+class RasterGcode:
+    # size: (w, h) piksel; dpi: piksel aralığı; power: (S min, S max) - materyal presetinden
+    # feed: yakma hızı, travel: boş hareket hızı (mm/dk, süre tahmini için)
+    def __init__(self, size, mode, dpi, power=(0, 1000), feed=3000, travel=6000,
+                 bidirectional=True, overscan=0.0):
+        self.width, self.height = size
+        self.pitch = 25.4 / float(dpi)
+        self.lut = power_lut(mode, power)
+        self.feed, self.travel = float(feed), float(travel)
+        self.bidirectional, self.overscan = bidirectional, float(overscan)
+        self.y = 0             # işlenen satır sayısı
+        self.pos = (0.0, 0.0)
+        self.reverse = False
+        self.stats = {"rows": 0, "burn_rows": 0, "segments": 0, "burn_mm": 0.0,
+                      "scan_mm": 0.0, "travel_mm": 0.0, "lines": 0}
+
+    def _move(self, x, y, rapid):# konum + süre hesabı
+        d = math.hypot(x - self.pos[0], y - self.pos[1])
+        self.stats["travel_mm" if rapid else "scan_mm"] += d
+        self.pos = (x, y)
+
+    def header(self):
+        yield ("; emergent1 LASER MASTER raster\n"
+               f"; {self.width}x{self.height} px, {self.pitch:.4f} mm/px\n"
+               f"G21\nG90\nM4 S0\nG1 F{self.feed:.0f}\n")
+
+    def rows(self, block):# block: (n, width) uint8 satırlar (yukarıdan aşağı) -> G-code metni
+        out = []
+        for row in np.asarray(block):
+            r = self.y; self.y += 1; self.stats["rows"] += 1
+            s = self.lut[row]
+            nz = np.flatnonzero(s)
+            if not nz.size: continue# boş satır: hiç hareket yok
+            c0, c1 = int(nz[0]), int(nz[-1]) + 1# kenar boşlukları atlanır
+            seg = s[c0:c1]
+            cut = np.flatnonzero(seg[1:] != seg[:-1]) + 1
+            starts = np.concatenate(([0], cut)) + c0
+            ends = np.concatenate((cut, [c1 - c0])) + c0
+            runs = list(zip(starts.tolist(), ends.tolist(), seg[starts - c0].tolist()))
+            y = (self.height - 1 - r) * self.pitch# G-code'da Y yukarı: ilk satır en üstte
+            p = self.pitch
+            if self.reverse:
+                runs = [(e, b, v) for b, e, v in reversed(runs)]
+                x0, d = c1 * p, -1
+            else:
+                x0, d = c0 * p, 1
+            lead = x0 - d * self.overscan
+            out.append(f"G0 X{lead:.3f} Y{y:.3f}\n"); self._move(lead, y, True)
+            if self.overscan:
+                out.append(f"G1 X{x0:.3f} S0\n"); self._move(x0, y, False)
+            for b, e, v in runs:
+                x = e * p
+                out.append(f"G1 X{x:.3f} S{v}\n"); self._move(x, y, False)
+                if v: self.stats["burn_mm"] += abs(e - b) * p
+            if self.overscan:
+                x = self.pos[0] + d * self.overscan
+                out.append(f"G1 X{x:.3f} S0\n"); self._move(x, y, False)
+            self.stats["segments"] += len(runs); self.stats["burn_rows"] += 1
+            if self.bidirectional: self.reverse = not self.reverse
+        self.stats["lines"] += len(out)
+        yield "".join(out)
+
+    def footer(self):
+        self._move(0.0, 0.0, True)
+        yield "M5\nG0 X0 Y0\n"
+
+    def lines(self, img, block_rows=256):# tüm iş: başlık, satırlar, bitiş
+        arr = np.asarray(img)
+        yield from self.header()
+        for y0 in range(0, arr.shape[0], block_rows):
+            yield from self.rows(arr[y0:y0 + block_rows])
+        yield from self.footer()
+
+    def estimate(self):# saniye: bu iş ve atlama yapılmadan (her satır, tam genişlik, tek yön) taransaydı
+        st = self.stats
+        t = 60 * (st["scan_mm"] / self.feed + st["travel_mm"] / self.travel)
+        w = (self.width * self.pitch + 2 * self.overscan)
+        naive = 60 * self.height * (w / self.feed + (w + self.pitch) / self.travel)
+        return t, naive
+
+
+class GcodeWriter:# PngStripeWriter ile aynı arayüz: render_tiled şeritleri doğrudan G-code'a yazılır
+    def __init__(self, path, size, mode, dpi, **opts):
+        self.job = RasterGcode(size, mode, dpi, **opts)
+        self._f = open(path, "w", encoding="ascii", newline="\n")
+        self._f.writelines(self.job.header())
+
+    def write(self, rows):
+        self._f.writelines(self.job.rows(rows))
+
+    def close(self):
+        if not self._f.closed:
+            self._f.writelines(self.job.footer())
+            self._f.close()
+
+
+def export_gcode(path, img, mode, dpi, **opts):# tek parça resim -> .gcode; istatistik + süre tahmini döner
+    job = RasterGcode(img.size, mode, dpi, **opts)
+    with open(path, "w", encoding="ascii", newline="\n") as f:
+        f.writelines(job.lines(img.convert("L")))
+    return job
+
+
+def format_time(seconds):# 5025 -> "1:23:45"
+    m, s = divmod(int(round(seconds)), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
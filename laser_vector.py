@@ -0,0 +1,171 @@
+# emergent1 LASER MASTER - line art vektör çıktısı (SVG / DXF)
+# line_art kontürleri çıkarılır, mm toleransıyla sadeleştirilir ve lazerin boş hareketi
+# kısalsın diye en yakın komşu + 2-opt ile sıralanır. Raster taramadaki boş alan gezintisi yok.
+import math
+import time
+
+import numpy as np
+
+
+VECTOR_FORMATS = ("svg", "dxf")
+
+
+def trace(line_art, w_mm, tolerance_mm=0.05, min_len_mm=0.0):# line_art (siyah çizgi) -> mm cinsinden kapalı yollar
+    import cv2# laser_engine ile aynı: açılışta yüklenmez
+    arr = np.asarray(line_art.convert("L"))
+    scale = float(w_mm) / arr.shape[1]
+    ink = (arr < 128).astype(np.uint8)# siyah pikseller ön plan
+    contours, _ = cv2.findContours(ink, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    eps = max(float(tolerance_mm) / scale, 0.0)
+    paths = []
+    for c in contours:
+        if eps: c = cv2.approxPolyDP(c, eps, True)
+        pts = (c.reshape(-1, 2) + 0.5) * scale# piksel merkezleri, mm
+        if len(pts) < 2: continue# tolerans altında kalan tek nokta (leke)
+        if min_len_mm and path_length(pts) < min_len_mm: continue
+        paths.append(pts)
+    return paths
+
+
+def path_length(pts):# kapalı yolun çevresi
+    return float(np.hypot(*(np.roll(pts, -1, 0) - pts).T).sum())
+
+
+def travel_length(paths, origin=(0.0, 0.0)):# başlangıçtan itibaren yollar arası boş hareket (kapalı yol: giriş = çıkış)
+    if not paths: return 0.0
+    entries = np.array([p[0] for p in paths])
+    hops = np.vstack([origin, entries])
+    return float(np.hypot(*np.diff(hops, axis=0).T).sum())
+
+
+def nearest_neighbour(paths, origin=(0.0, 0.0), ring_max=4):# yol girişleri üzerinde en yakın komşu sırası
+    # Girişler ızgara hücrelerine dağıtılır; arama bulunduğu hücreden halka halka genişler.
+    # Yakında aday kalmadıysa (seyrek son noktalar) kalanlar üzerinde tek numpy taraması yapılır.
+    pts = np.array([p[0] for p in paths], dtype=np.float64)
+    n = len(pts)
+    lo = np.minimum(pts.min(0), origin)
+    span = np.maximum(pts.max(0), origin) - lo
+    g = max(math.sqrt(span[0] * span[1] * 2.0 / n), 1e-6)# hücre başına ~2 giriş
+    cell = ((pts - lo) // g).astype(np.int64)
+    cells = {}
+    for i, c in enumerate(map(tuple, cell.tolist())): cells.setdefault(c, []).append(i)
+    xs, ys = pts[:, 0].tolist(), pts[:, 1].tolist()
+    alive = np.ones(n, bool)
+    order, (cx, cy) = [], origin
+    for _ in range(n):
+        gx, gy = int((cx - lo[0]) // g), int((cy - lo[1]) // g)
+        best, bd = -1, math.inf
+        for r in range(ring_max + 1):
+            for ox in range(-r, r + 1):
+                for oy in ((-r, r) if abs(ox) != r else range(-r, r + 1)):
+                    for i in cells.get((gx + ox, gy + oy), ()):
+                        d = (xs[i] - cx)**2 + (ys[i] - cy)**2
+                        if d < bd: best, bd = i, d
+            if best >= 0 and bd <= (r * g)**2: break# sonraki halka daha yakın olamaz
+        else:
+            rest = np.flatnonzero(alive)
+            best = int(rest[np.argmin((pts[rest, 0] - cx)**2 + (pts[rest, 1] - cy)**2)])
+        alive[best] = False
+        cells[tuple(cell[best].tolist())].remove(best)
+        order.append(best); cx, cy = xs[best], ys[best]
+    return order
+
+
+def two_opt(pts, window=48, passes=8, block=8192, min_gain=1e-3):# pencereli 2-opt: pts[0] sabit başlangıç -> permütasyon
+    # segment [i, j] ters çevrilirse kazanç: d(i-1, j) + d(i, j+1) - d(i-1, i) - d(j, j+1).
+    # Her turda tüm i'ler için en iyi j tek numpy hesabıyla bulunur; birbirine değmeyen
+    # iyileştirmeler kazanç sırasıyla uygulanır. Tur kazancı toplamın min_gain'inden azsa durur.
+    n = len(pts)
+    perm = np.arange(n)
+    if n < 4: return perm
+    for _ in range(passes):
+        X, Y = pts[perm, 0], pts[perm, 1]
+        edge = np.append(np.hypot(np.diff(X), np.diff(Y)), 0.0)# edge[j] = d(j, j+1); açık uçta 0
+        best_k, best = [], []
+        for b0 in range(1, n - 1, block):
+            i = np.arange(b0, min(n - 1, b0 + block))[:, None]
+            j = np.minimum(i + np.arange(1, window + 1)[None, :], n - 1)
+            nx = np.minimum(j + 1, n - 1)# j son nokta ise d(i, nx) - edge[j] terimi düşer
+            tail = np.where(j + 1 < n, np.hypot(X[i] - X[nx], Y[i] - Y[nx]) - edge[j], 0.0)
+            delta = np.hypot(X[i - 1] - X[j], Y[i - 1] - Y[j]) - edge[i - 1] + tail
+            k = np.argmin(delta, axis=1)
+            best_k.append(k); best.append(delta[np.arange(len(k)), k])
+        best_k, best = np.concatenate(best_k), np.concatenate(best)
+        cand = np.flatnonzero(best < -1e-9)
+        if not cand.size or -best[cand].sum() < min_gain * edge.sum(): break
+        touched = np.zeros(n + 1, bool)
+        for c in cand[np.argsort(best[cand])].tolist():
+            i = c + 1; j = min(i + int(best_k[c]) + 1, n - 1)
+            if touched[i - 1:j + 2].any(): continue
+            touched[i - 1:j + 2] = True
+            perm[i:j + 1] = perm[i:j + 1][::-1].copy()
+    return perm
+
+
+def _rotate_entries(paths, origin=(0.0, 0.0)):# kapalı yola önceki konuma en yakın köşeden girilir
+    out, cur = [], np.asarray(origin, np.float64)
+    for p in paths:
+        k = int(np.argmin(((p - cur)**2).sum(1)))
+        if k: p = np.concatenate((p[k:], p[:k]))
+        out.append(p); cur = p[0]
+    return out
+
+
+def order_paths(paths, origin=(0.0, 0.0), window=48):# -> sıralı yollar, boş hareket raporu (mm)
+    report = {"travel_mm": travel_length(paths, origin)}
+    if len(paths) < 2:
+        report["travel_nn_mm"] = report["travel_opt_mm"] = report["travel_mm"]
+        return list(paths), report
+    paths = [paths[i] for i in nearest_neighbour(paths, origin)]
+    report["travel_nn_mm"] = travel_length(paths, origin)
+    pts = np.vstack([origin, [p[0] for p in paths]])
+    perm = two_opt(pts, window)
+    paths = _rotate_entries([paths[i - 1] for i in perm[1:]], origin)
+    report["travel_opt_mm"] = travel_length(paths, origin)
+    return paths, report
+
+
+def svg_lines(paths, size_mm, stroke_mm=0.1):# SVG metni (mm boyutlu, y aşağı)
+    w, h = size_mm
+    yield (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+           f'<svg xmlns="http://www.w3.org/2000/svg" width="{w:.3f}mm" height="{h:.3f}mm" '
+           f'viewBox="0 0 {w:.3f} {h:.3f}">\n'
+           f'<g fill="none" stroke="#000" stroke-width="{stroke_mm}">\n')
+    for p in paths:
+        d = " L".join(f"{x:.3f},{y:.3f}" for x, y in p.tolist())
+        yield f'<path d="M{d} Z"/>\n'
+    yield "</g>\n</svg>\n"
+
+
+def dxf_lines(paths, size_mm):# R12 ASCII DXF (mm, y yukarı): her yol kapalı POLYLINE
+    h = size_mm[1]
+    yield "0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n9\n$INSUNITS\n70\n4\n0\nENDSEC\n0\nSECTION\n2\nENTITIES\n"
+    for p in paths:
+        v = "".join(f"0\nVERTEX\n8\n0\n10\n{x:.3f}\n20\n{h - y:.3f}\n" for x, y in p.tolist())
+        yield f"0\nPOLYLINE\n8\n0\n66\n1\n70\n1\n{v}0\nSEQEND\n8\n0\n"
+    yield "0\nENDSEC\n0\nEOF\n"
+
+
+def export_vector(path, line_art, w_mm, fmt=None, tolerance_mm=0.05, min_len_mm=0.0, optimize=True):
+    # line_art (PIL) -> .svg / .dxf; rapor: yol/nokta sayısı, kesim ve boş hareket uzunlukları (mm)
+    fmt = fmt or path.rsplit(".", 1)[-1].lower()
+    t0 = time.perf_counter()
+    paths = trace(line_art, w_mm, tolerance_mm, min_len_mm)
+    size_mm = (float(w_mm), float(w_mm) * line_art.height / line_art.width)
+    if optimize:
+        paths, report = order_paths(paths)
+    else:
+        t = travel_length(paths)
+        report = {"travel_mm": t, "travel_nn_mm": t, "travel_opt_mm": t}
+    report.update(paths=len(paths), points=sum(len(p) for p in paths),
+                  cut_mm=sum(path_length(p) for p in paths))
+    lines = svg_lines(paths, size_mm) if fmt == "svg" else dxf_lines(paths, size_mm)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(lines)
+    report["seconds"] = time.perf_counter() - t0
+    return report
+
+
+def format_report(r):# tek satırlık özet (CLI / bilgi paneli)
+    return (f"{r['paths']} yol, kesim {r['cut_mm'] / 1000:.2f} m, boş hareket "
+            f"{r['travel_mm'] / 1000:.2f} m -> {r['travel_opt_mm'] / 1000:.2f} m ({r['seconds']:.1f}s)")
@@ -0,0 +1,92 @@
+# emergent1 LASER MASTER - boru hattı regresyon testleri (python -m pytest -q)
+from PIL import Image
+import numpy as np
+
+import laser_cache
+import laser_engine
+
+
+PARAMS = dict(laser_engine.DEFAULT_PARAMS, w_mm=20, dpi=100)
+
+
+def test_disk_cache_new_source(tmp_path):# disk önbellekli Pipeline'da ikinci resim kendi çıktısını vermeli
+    pipe = laser_engine.Pipeline(disk=laser_cache.DiskCache(str(tmp_path), background=False), workers=1)
+    white = Image.new("RGBA", (120, 90), (255, 255, 255, 255))
+    black = Image.new("RGBA", (120, 90), (0, 0, 0, 255))
+    a = pipe.render(white, PARAMS)["gray"]
+    b = pipe.render(black, PARAMS)["gray"]
+    c = pipe.render(white.copy(), PARAMS)["gray"]# aynı içerik: diskteki anahtar
+    assert np.asarray(a).mean() > 200 and np.asarray(b).mean() < 50
+    assert np.array_equal(np.asarray(a), np.asarray(c))
+    fresh = laser_engine.Pipeline(workers=1).render(black, PARAMS)
+    assert np.array_equal(np.asarray(fresh["line_art"]), np.asarray(pipe.render(black, PARAMS)["line_art"]))
+
+
+def test_floyd_steinberg_stripes_match_pillow():# şeritli (render_tiled) ve tek parça gray_d aynı olmalı
+    import laser_dither
+    gray = np.random.RandomState(0).randint(0, 256, (150, 90)).astype(np.uint8)
+    ditherer = laser_dither.Ditherer("floyd-steinberg", gray.shape[1])
+    stripes = np.vstack([ditherer.feed(gray[y:y + 32]) for y in range(0, gray.shape[0], 32)])
+    assert np.array_equal(stripes, np.asarray(laser_dither.dither(Image.fromarray(gray))))
+
+
+def test_source_image_rgba_png_and_exif_jpeg(tmp_path):# tam çözünürlük dosya kapandıktan sonra da kullanılabilir
+    png = str(tmp_path / "a.png")
+    Image.new("RGBA", (40, 30), (10, 20, 30, 128)).save(png)
+    full = laser_engine.SourceImage(png).full()
+    assert full.mode == "RGBA" and full.size == (40, 30) and full.getpixel((0, 0)) == (10, 20, 30, 128)
+    jpg = str(tmp_path / "r.jpg")
+    rgb = Image.new("RGB", (60, 20), (255, 255, 255)); rgb.paste((0, 0, 0), (0, 0, 10, 20))# sol kenar siyah
+    exif = rgb.getexif(); exif[0x0112] = 6# 90° saat yönünde göster
+    rgb.save(jpg, exif=exif, quality=95)
+    src = laser_engine.SourceImage(jpg)
+    img = src.full()
+    assert src.size == img.size == (20, 60)
+    assert img.getpixel((10, 2))[0] < 50 and img.getpixel((10, 57))[0] > 200# sol kenar yukarı döner
+
+
+def test_tone_luts_match_image_enhance():# gri ve sketch tabanı eski ImageEnhance zinciriyle birebir aynı
+    from PIL import ImageEnhance, ImageOps
+    import cv2
+    rs = np.random.RandomState(1)
+    luma = Image.fromarray(np.clip(rs.normal(120, 60, (80, 110)), 0, 255).astype(np.uint8))
+    hist = luma.histogram()
+    for mat in sorted(laser_engine.PRESETS):
+        for invert in (False, True):
+            p = laser_engine.preset_params(mat, invert=invert)
+            b, c = p["bright"], p["contrast"]
+            base = ImageEnhance.Contrast(ImageEnhance.Brightness(luma).enhance(b)).enhance(c)
+            gri = ImageEnhance.Contrast(ImageEnhance.Brightness(luma).enhance(laser_engine.DEFAULT_BRIGHT * b)).enhance(
+                laser_engine.DEFAULT_CONTRAST * c)
+            if invert: base, gri = ImageOps.invert(base), ImageOps.invert(gri)
+            assert np.array_equal(np.asarray(laser_engine._base_tone(luma, hist, b, c, invert)), np.asarray(base)), (mat, invert)
+            assert np.array_equal(np.asarray(laser_engine._gray_tone(luma, hist, b, c, invert)), np.asarray(gri)), (mat, invert)
+            strg = p["bg"]; block = int(11 + strg//5*2)
+            np_img = np.asarray(base)
+            th = cv2.adaptiveThreshold(np_img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block | 1, 5)
+            ref = (np_img*(1-strg/100) + th*(strg/100)).astype(np.uint8)
+            assert np.array_equal(np.asarray(laser_engine._bg_clean(base, strg, laser_engine._odd(block))), ref), mat
+
+
+def test_render_tiled_matches_pipeline(tmp_path):# şeritli çıktı tek parça render'a eşit (dikiş izi yok)
+    rs = np.random.RandomState(3)
+    y, x = np.mgrid[0:240, 0:320]
+    a = np.clip(128 + 70 * np.sin(x / 11) * np.cos(y / 17) + rs.randint(-25, 26, (240, 320)), 0, 255).astype(np.uint8)
+    img = Image.fromarray(np.dstack([a, a, a])).convert("RGBA")
+    tile_rows = 32# çıktı 354 satır: 12 şerit
+    for mat in sorted(laser_engine.PRESETS):
+        params = laser_engine.preset_params(mat, w_mm=40, dpi=300)
+        ref = laser_engine.Pipeline(workers=1).render(img, params)
+        out = {k: str(tmp_path / f"{mat}_{k}.png") for k in ("gray", "sketch", "line_art")}
+        laser_engine.render_tiled(img, params, out, tile_rows=tile_rows)
+        for k, path in out.items():
+            with Image.open(path) as im:
+                tiled = np.asarray(im.convert("L")).astype(int)
+            diff = np.abs(tiled - np.asarray(ref[k].convert("L")).astype(int))
+            if k == "gray":# şerit bazlı resize: birkaç seviye
+                assert diff.max() <= 3, (mat, k, diff.max())
+            else:# sketch (kontrast x3) ve line_art neredeyse ikili: eşik komşusu tek tük piksel döner
+                assert (diff > 0).mean() < 0.001, (mat, k, (diff > 0).mean())
+            rows = np.flatnonzero(diff.max(1))
+            seam = np.isin(rows % tile_rows, (0, tile_rows - 1))
+            assert not rows.size or seam.mean() < 0.5, (mat, k)# farklar şerit sınırına yığılmamalı